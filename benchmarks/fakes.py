@@ -0,0 +1,149 @@
+"""
+Offline stand-ins for the remote services, used by the benchmarks.
+
+Embeddings come from the local HashingEmbeddingProvider in
+src.services.embedding_providers. FakeLLMClient mimics the parts of the
+Anthropic client the LLM gateway calls (`messages.create` and `messages.stream`).
+FakeDriveService serves a local folder through the Drive v3 calls DriveSync makes.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Callable, List
+
+
+class _FakeStream:
+    def __init__(self, tokens: List[str], token_delay: float, usage):
+        self._tokens = tokens
+        self._token_delay = token_delay
+        self.current_message_snapshot = SimpleNamespace(usage=usage)
+
+    @property
+    def text_stream(self):
+        for token in self._tokens:
+            if self._token_delay:
+                time.sleep(self._token_delay)
+            yield token
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _FakeMessages:
+    def __init__(self, client: "FakeLLMClient"):
+        self._client = client
+
+    def create(self, **kwargs):
+        text = self._client.answer(kwargs)
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=self._client.usage(kwargs, text))
+
+    def stream(self, **kwargs):
+        text = self._client.answer(kwargs)
+        if self._client.latency:
+            time.sleep(self._client.latency)
+        tokens = re.findall(r"\S+\s*", text)
+        return _FakeStream(tokens, self._client.token_delay, self._client.usage(kwargs, text))
+
+
+class FakeLLMClient:
+    """
+    Anthropic-shaped client returning canned answers after a fixed latency.
+
+    By default it echoes the first words of the prompt, so the answer length
+    follows the context size like a real model's would.
+    """
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0, answer_words: int = 120, response: str = None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self.response = response
+        self.messages = _FakeMessages(self)
+
+    def answer(self, kwargs: dict) -> str:
+        if self.response is not None:
+            return self.response
+        prompt = " ".join(str(message.get("content", "")) for message in kwargs.get("messages", []))
+        return " ".join(prompt.split()[:self.answer_words])
+
+    @staticmethod
+    def usage(kwargs: dict, text: str):
+        prompt = " ".join(str(message.get("content", "")) for message in kwargs.get("messages", []))
+        return SimpleNamespace(input_tokens=len(prompt.split()), output_tokens=len(text.split()))
+
+
+class _FakeRequest:
+    def __init__(self, fn: Callable):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class FakeDriveService:
+    """
+    Drive v3 service backed by a local folder of PDFs.
+
+    `files().list()` reports the folder's PDFs with md5Checksum and modifiedTime
+    (paginated by `pageSize`) and `files().get_media()` returns their bytes, each
+    after `latency` seconds. File ids are the file names. Calls are counted so a
+    benchmark can check what a re-sync costs. Safe to share between threads.
+    """
+
+    def __init__(self, folder: str, latency: float = 0.0):
+        self.folder = folder
+        self.latency = latency
+        self.list_calls = 0
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+    def files(self) -> "FakeDriveService":
+        return self
+
+    def _describe(self, name: str) -> dict:
+        path = os.path.join(self.folder, name)
+        with open(path, "rb") as f:
+            md5 = hashlib.md5(f.read()).hexdigest()
+        stat = os.stat(path)
+        return {
+            "id": name,
+            "name": name,
+            "md5Checksum": md5,
+            "modifiedTime": datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc).isoformat(),
+            "size": str(stat.st_size),
+        }
+
+    def list(self, pageSize: int = 100, pageToken: str = None, **kwargs) -> _FakeRequest:
+        def execute():
+            with self._lock:
+                self.list_calls += 1
+            if self.latency:
+                time.sleep(self.latency)
+            names = sorted(name for name in os.listdir(self.folder) if name.lower().endswith(".pdf"))
+            start = int(pageToken or 0)
+            response = {"files": [self._describe(name) for name in names[start:start + pageSize]]}
+            if start + pageSize < len(names):
+                response["nextPageToken"] = str(start + pageSize)
+            return response
+
+        return _FakeRequest(execute)
+
+    def get_media(self, fileId: str, **kwargs) -> _FakeRequest:
+        def execute():
+            with self._lock:
+                self.downloads += 1
+            if self.latency:
+                time.sleep(self.latency)
+            with open(os.path.join(self.folder, fileId), "rb") as f:
+                return f.read()
+
+        return _FakeRequest(execute)
@@ -0,0 +1,185 @@
+"""
+Cold-start import benchmark.
+
+Imports every app module in a fresh interpreter, records its wall-clock import
+time (median over `--repeat` runs), the slowest packages reported by
+`python -X importtime`, and which heavy optional dependencies were pulled in.
+Results are written as JSON and checked against `import_budget.json`, so an
+import that becomes slower or starts loading a heavy dependency eagerly fails
+the run.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [--output results.json] [--budget benchmarks/import_budget.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "import_budget.json")
+
+MODULES = [
+    "src.agent.llm_gateway",
+    "src.agent.generative_agent",
+    "src.agent.checking_agent",
+    "src.services.QueryTransformation",
+    "src.services.embedding_cache",
+    "src.services.loading_documents",
+    "src.services.chunking_process",
+    "src.services.reranking_process",
+    "src.services.lexical_index",
+    "src.services.term_index",
+    "src.services.ann_index",
+    "src.services.sqlite_docstore",
+    "src.services.vector_storage_service",
+    "src.services.retrieval_orchestrator",
+    "src.services.query_cache",
+    "src.services.resource_registry",
+    "src.services.driver_service",
+    "src.services.drive_sync",
+]
+
+# Dependencies that should only load when the feature using them runs.
+HEAVY_MODULES = [
+    "spacy",
+    "fitz",
+    "faiss",
+    "chromadb",
+    "sklearn",
+    "langchain_experimental",
+    "langchain_community.vectorstores",
+    "langchain_google_community",
+    "langchain_google_genai",
+    "googleapiclient",
+    "anthropic",
+]
+
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+error = None
+try:
+    import {module}
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"ms": elapsed, "heavy": heavy, "error": error}}))
+"""
+
+
+def _run_child(module: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    args = [sys.executable]
+    if importtime:
+        args += ["-X", "importtime"]
+    args += ["-c", _CHILD.format(module=module, heavy=HEAVY_MODULES)]
+    return subprocess.run(args, cwd=ROOT, capture_output=True, text=True, env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"})
+
+
+def _importtime_entries(importtime_log: str) -> Dict[str, float]:
+    """Parses top-level entries (cumulative ms) of an -X importtime log."""
+    cumulative: Dict[str, float] = {}
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            total_us = int(parts[1].strip())
+        except ValueError:
+            continue
+        name = parts[2]
+        # Only top-level entries: nested imports are indented below their parent.
+        if name.startswith(" ") and not name.startswith("  "):
+            cumulative[name.strip()] = cumulative.get(name.strip(), 0.0) + total_us / 1000
+    return cumulative
+
+
+def _top_packages(importtime_log: str, startup: Dict[str, float], limit: int = 10) -> List[Dict[str, float]]:
+    """Returns the slowest top-level packages imported by the module, excluding interpreter startup."""
+    cumulative = {name: ms for name, ms in _importtime_entries(importtime_log).items() if name not in startup}
+    ranked = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return [{"package": package, "ms": round(ms, 2)} for package, ms in ranked]
+
+
+def measure(module: str, repeat: int, startup: Dict[str, float]) -> dict:
+    timings, heavy, error = [], [], None
+    for _ in range(repeat):
+        proc = _run_child(module)
+        try:
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (IndexError, json.JSONDecodeError):
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "no output"
+            break
+        timings.append(result["ms"])
+        heavy = result["heavy"]
+        error = result["error"]
+        if error:
+            break
+
+    profile = _run_child(module, importtime=True)
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(timings), 2) if timings else None,
+        "min_ms": round(min(timings), 2) if timings else None,
+        "heavy_dependencies": heavy,
+        "top_packages": _top_packages(profile.stderr, startup),
+        "error": error,
+    }
+
+
+def check_budget(results: List[dict], budget: dict) -> List[str]:
+    """Returns one message per module that exceeds its time budget or loads a forbidden dependency."""
+    violations = []
+    default_ms = budget.get("default_ms")
+    for result in results:
+        module_budget = budget.get("modules", {}).get(result["module"], {})
+        if result["error"]:
+            violations.append(f"{result['module']}: import failed ({result['error']})")
+            continue
+        max_ms = module_budget.get("max_ms", default_ms)
+        if max_ms is not None and result["median_ms"] > max_ms:
+            violations.append(f"{result['module']}: {result['median_ms']:.1f} ms > budget {max_ms} ms")
+        forbidden = set(module_budget.get("forbidden", budget.get("forbidden", [])))
+        eager = sorted(forbidden & set(result["heavy_dependencies"]))
+        if eager:
+            violations.append(f"{result['module']}: eagerly imports {', '.join(eager)}")
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh-interpreter runs per module")
+    parser.add_argument("--modules", nargs="*", default=MODULES, help="modules to measure")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--budget", default=DEFAULT_BUDGET, help="budget file; pass '' to skip the check")
+    args = parser.parse_args()
+
+    # The child script itself imports json/sys/time; profile that once and leave it out.
+    startup = _importtime_entries(_run_child("sys", importtime=True).stderr)
+    results = [measure(module, args.repeat, startup) for module in args.modules]
+    report = {"python": sys.version.split()[0], "repeat": args.repeat, "results": results}
+
+    violations = []
+    if args.budget:
+        with open(args.budget, "r", encoding="utf-8") as f:
+            violations = check_budget(results, json.load(f))
+        report["budget_violations"] = violations
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    for violation in violations:
+        print(f"[BUDGET] {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
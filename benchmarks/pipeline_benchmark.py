@@ -0,0 +1,268 @@
+"""
+Offline ingestion and retrieval benchmark.
+
+Runs the real pipeline (DocumentLoader -> SemanticChunkerWithNLP ->
+VectorStorageManager -> RetrievalOrchestrator / RerankingProcess -> generation)
+over the bundled PDFs, with HashingEmbeddingProvider in place of the Google embedding
+API and FakeLLMClient in place of Bedrock, so runs are repeatable and need no
+credentials. spaCy's en_core_web_sm must be installed.
+
+Reports pages/sec, Drive sync cost against a fake Drive API, chunks/sec,
+index build time and on-disk size, and p50/p95/p99 latencies for dense
+search, hybrid search, reranking and generation, as JSON for comparison
+between commits.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--data local_folders/rag-data_1] [--queries 50] [--output results.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from benchmarks.fakes import FakeDriveService, FakeLLMClient  # noqa: E402
+
+DEFAULT_DATA = os.path.join(ROOT, "local_folders", "rag-data_1")
+
+SEED_QUERIES = [
+    "What are the main crops grown in India?",
+    "How did the Green Revolution change agricultural output?",
+    "What role did irrigation play in Indian agriculture?",
+    "Who led the Indian independence movement?",
+    "What was the Quit India Movement?",
+    "How did the partition of India happen in 1947?",
+    "What was the impact of the salt march?",
+    "How important is agriculture to India's GDP?",
+]
+
+
+def percentiles(samples: List[float]) -> dict:
+    """p50/p95/p99/mean/max of latency samples, in milliseconds."""
+    if not samples:
+        return {"n": 0}
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "n": int(values.size),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_queries(chunks, count: int, seed: int) -> List[str]:
+    """Seed questions plus sentences sampled from the corpus, deterministically."""
+    rng = random.Random(seed)
+    sentences = [s for chunk in chunks for s in chunk.metadata.get("sentences", []) if len(s.split()) >= 6]
+    sampled = rng.sample(sentences, min(len(sentences), max(0, count - len(SEED_QUERIES))))
+    return (SEED_QUERIES + sampled)[:count]
+
+
+def run(args) -> dict:
+    from src.agent.generative_agent import GenerationStream
+    from src.services.ann_index import IndexSpec
+    from src.services.chunking_process import SemanticChunkerWithNLP
+    from src.services.drive_sync import DriveSync
+    from src.services.embedding_providers import HashingEmbeddingProvider
+    from src.services.loading_documents import DocumentLoader
+    from src.services.reranking_process import RerankingProcess
+    from src.services.retrieval_orchestrator import RetrievalOrchestrator
+    from src.services.vector_storage_service import VectorStorageManager
+
+    embeddings = HashingEmbeddingProvider(dimensions=args.dimensions)
+    filenames = sorted(name for name in os.listdir(args.data) if name.lower().endswith(".pdf"))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "data": os.path.relpath(args.data, ROOT),
+            "files": len(filenames),
+            "embedder": embeddings.info.to_dict(),
+            "index_kind": args.index_kind,
+            "seed": args.seed,
+        }
+    }
+
+    loader = DocumentLoader(max_workers=args.workers)
+    pages, load_time = timed(loader.load_from_local, args.data)
+    report["loading"] = {
+        "pages": len(pages),
+        "seconds": round(load_time, 4),
+        "pages_per_sec": round(len(pages) / load_time, 2) if load_time else None,
+        "workers": loader.max_workers,
+    }
+
+    drive = FakeDriveService(args.data, latency=args.drive_latency)
+    with tempfile.TemporaryDirectory(prefix="rag-bench-drive-") as cache_dir:
+        drive_sync = DriveSync(cache_dir=cache_dir, service_factory=lambda: drive)
+        first, first_time = timed(drive_sync.sync, "bench-folder")
+        first_calls = {"list_calls": drive.list_calls, "downloads": drive.downloads}
+        drive.list_calls = drive.downloads = 0
+        resync, resync_time = timed(drive_sync.sync, "bench-folder")
+        report["drive_sync"] = {
+            "fake_drive_latency_s": args.drive_latency,
+            "first_sync": {"seconds": round(first_time, 4), "files": len(first.added), **first_calls},
+            "resync": {
+                "seconds": round(resync_time, 4),
+                "unchanged": len(resync.unchanged),
+                "list_calls": drive.list_calls,
+                "downloads": drive.downloads,
+            },
+        }
+
+    chunker = SemanticChunkerWithNLP(embed_model=embeddings)
+    chunks, chunk_time = timed(chunker.chunk_and_enrich, pages)
+    report["chunking"] = {
+        "chunks": len(chunks),
+        "seconds": round(chunk_time, 4),
+        "chunks_per_sec": round(len(chunks) / chunk_time, 2) if chunk_time else None,
+        "pages_per_sec": round(len(pages) / chunk_time, 2) if chunk_time else None,
+    }
+
+    manager = VectorStorageManager(embedding_model=embeddings, index_spec=IndexSpec(kind=args.index_kind))
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as index_path:
+        vector_store, build_time = timed(manager.store_in_faiss, chunks, index_path)
+        if not vector_store:
+            raise RuntimeError("Index build failed")
+        report["indexing"] = {
+            "vectors": int(vector_store.index.ntotal),
+            "seconds": round(build_time, 4),
+            "vectors_per_sec": round(vector_store.index.ntotal / build_time, 2) if build_time else None,
+            "bytes_on_disk": directory_size(index_path),
+            "files": {name: os.path.getsize(os.path.join(index_path, name)) for name in sorted(os.listdir(index_path))},
+        }
+
+        with tempfile.TemporaryDirectory(prefix="rag-bench-stream-") as stream_path:
+            # Same corpus through the bounded-queue pipeline: loading, chunking and indexing overlap.
+            streamed, stream_time = timed(manager.store_pages_in_faiss, loader.iter_from_local(args.data), stream_path, chunker)
+            if not streamed:
+                raise RuntimeError("Streaming ingestion failed")
+            sequential_time = load_time + chunk_time + report["indexing"]["seconds"]
+            report["streaming_ingestion"] = {
+                "vectors": int(streamed.index.ntotal),
+                "seconds": round(stream_time, 4),
+                "sequential_seconds": round(sequential_time, 4),
+                "speedup": round(sequential_time / stream_time, 2) if stream_time else None,
+            }
+
+        vector_store, load_store_time = timed(manager.exist_in_faiss, index_path)
+        lexical_index = manager.load_lexical_index(index_path, vector_store)
+        term_index = manager.load_term_index(index_path, vector_store)
+        report["indexing"]["load_seconds"] = round(load_store_time, 4)
+
+        reranker = RerankingProcess(embed_model=embeddings)
+        orchestrator = RetrievalOrchestrator(reranker=reranker, max_workers=1)
+        queries = build_queries(chunks, args.queries, args.seed)
+        query_embeddings = embeddings.embed_queries(queries)
+
+        # Warm-up pass so one-off costs (first spaCy call, page faults) are not counted.
+        for query, embedding in zip(queries[:3], query_embeddings[:3]):
+            docs = orchestrator._search(vector_store, query, embedding, lexical_index)
+            reranker.rerank(query, docs, vector_store=vector_store, query_embedding=embedding, term_index=term_index)
+
+        dense, hybrid, rerank, end_to_end = [], [], [], []
+        for query, embedding in zip(queries, query_embeddings):
+            _, elapsed = timed(orchestrator._search, vector_store, query, embedding, None)
+            dense.append(elapsed)
+            docs, elapsed = timed(orchestrator._search, vector_store, query, embedding, lexical_index)
+            hybrid.append(elapsed)
+            _, elapsed = timed(
+                reranker.rerank, query, docs, vector_store=vector_store, query_embedding=embedding, term_index=term_index
+            )
+            rerank.append(elapsed)
+            _, elapsed = timed(
+                orchestrator.retrieve, vector_store, {"Q1": query},
+                use_reranking=True, rerank_top_k=5, lexical_index=lexical_index, term_index=term_index
+            )
+            end_to_end.append(elapsed)
+
+        report["retrieval"] = {
+            "queries": len(queries),
+            "dense_mmr": percentiles(dense),
+            "hybrid_rrf": percentiles(hybrid),
+            "retrieve_with_rerank": percentiles(end_to_end),
+        }
+        report["rerank"] = percentiles(rerank)
+
+        client = FakeLLMClient(latency=args.llm_latency, token_delay=args.llm_token_delay)
+        first_token, total = [], []
+        for query in queries[:args.generations]:
+            context = orchestrator.retrieve(
+                vector_store, {"Q1": query}, lexical_index=lexical_index, term_index=term_index
+            )[0]
+            generation = GenerationStream(
+                f"\nQuestion 1: {context['question']}\n\nContext 1:\n{context['context']}\n", client=client, model="fake"
+            )
+            for _ in generation:
+                pass
+            first_token.append(generation.time_to_first_token or 0.0)
+            total.append(generation.total_time or 0.0)
+        report["generation"] = {
+            "fake_llm_latency_s": args.llm_latency,
+            "time_to_first_token": percentiles(first_token),
+            "total": percentiles(total),
+        }
+
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DEFAULT_DATA, help="folder of PDFs to ingest")
+    parser.add_argument("--queries", type=int, default=50, help="number of retrieval queries")
+    parser.add_argument("--generations", type=int, default=10, help="number of fake-LLM generations")
+    parser.add_argument("--dimensions", type=int, default=384, help="hashing embedder dimensions")
+    parser.add_argument("--index-kind", default="flat", help="FAISS index kind (see IndexSpec)")
+    parser.add_argument("--workers", type=int, default=None, help="DocumentLoader worker processes")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake LLM latency before the first token (s)")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="fake LLM delay per streamed token (s)")
+    parser.add_argument("--drive-latency", type=float, default=0.0, help="fake Drive API latency per call (s)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,36 @@
 import os
-from uuid import uuid4
+import time
 import streamlit as st
 from dotenv import load_dotenv
 
-from src.services.driver_service import load_document_from_drive
-from src.agent.checking_agent import validate_response_with_claude
-from src.agent.generative_agent import talk_to_anthropic
+from src.services.drive_sync import DriveSync
+from src.agent.answering_agent import PerQuestionAnswerer
 from src.services.vector_storage_service import VectorStorageManager
 from src.services.chunking_process import SemanticChunkerWithNLP
+from src.services.context_assembler import ContextAssembler
+from src.services.groundedness import GroundednessChecker
 from src.services.loading_documents import DocumentLoader
 from src.services.QueryTransformation import QueryTransformation
 from src.services.reranking_process import RerankingProcess
+from src.services.retrieval_orchestrator import RetrievalOrchestrator
+from src.services.resource_registry import get_registry
+from src.services.tracing import get_tracer
 
 load_dotenv()
 
-query_transformer = QueryTransformation()
-document_loader = DocumentLoader()
-semantic_chunker_nlp = SemanticChunkerWithNLP()
-vector_store_manager = VectorStorageManager()
-reranking_process = RerankingProcess()
+# Streamlit reruns this script on every interaction; the registry builds these once per process.
+registry = get_registry()
+tracer = get_tracer()
+query_transformer = registry.get("query_transformer", QueryTransformation)
+document_loader = registry.get("document_loader", DocumentLoader)
+semantic_chunker_nlp = registry.get("semantic_chunker", SemanticChunkerWithNLP)
+vector_store_manager = registry.get("vector_store_manager", VectorStorageManager)
+reranking_process = registry.get("reranking_process", RerankingProcess)
+drive_sync = registry.get("drive_sync", DriveSync)
+context_assembler = registry.get("context_assembler", ContextAssembler.from_env)
+groundedness_checker = registry.get("groundedness_checker", GroundednessChecker.from_env)
+answerer = registry.get("answerer", lambda: PerQuestionAnswerer.from_env(groundedness_checker))
+retrieval_orchestrator = registry.get("retrieval_orchestrator", lambda: RetrievalOrchestrator(reranker=reranking_process))
 
 st.set_page_config(page_title="RAG System", layout="wide")
 st.title("📄 Retrieval-Augmented Generation (RAG) System")
@@ -30,7 +42,8 @@ defaults = {
     "document_location": "Local",
     "storage_type": "Old",
     "load_document": False,
-    "vector_store": None,
+    "vector_store_path": "",
+    "use_hybrid_retrieval": True,
     "chat_history": [],
     "local_data_folder_path": "",
     "use_reranking": True,
@@ -42,10 +55,16 @@ for key, val in defaults.items():
 st.session_state.document_location = st.sidebar.selectbox("Document Source", ("Local", "Google Drive"))
 st.session_state.storage_type = st.sidebar.selectbox("Vector Storage Type", ("Old", "New"))
 
+st.session_state.use_hybrid_retrieval = st.sidebar.checkbox(
+    "Hybrid Lexical + Dense Retrieval", value=st.session_state.use_hybrid_retrieval
+)
 st.session_state.use_reranking = st.sidebar.checkbox("Enable Reranking", value=st.session_state.use_reranking)
 if st.session_state.use_reranking:
     st.session_state.rerank_top_k = st.sidebar.slider("Top K after Reranking", min_value=1, max_value=10, value=st.session_state.rerank_top_k)
 
+with st.sidebar.expander("📈 Pipeline Metrics", expanded=False):
+    st.code(tracer.prometheus_text(), language="text")
+
 
 def handle_folder_selection():
     if st.session_state.document_location == "Local":
@@ -85,31 +104,87 @@ if st.sidebar.button("Load Documents", disabled=load_disabled):
     st.session_state.load_document = True
 
 
+def render_timings(rows):
+    with st.expander("⏱️ View Timing Breakdown", expanded=False):
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
+def progress_reporter():
+    progress_bar = st.progress(0.0, text="Starting ingestion...")
+
+    def report(progress):
+        text = f"📥 {progress.pages_read} pages read, {progress.chunks_indexed} chunks indexed ({progress.chunks_per_sec:.1f} chunks/s)"
+        if progress.restored_chunks:
+            text += f", {progress.restored_chunks} resumed from checkpoint"
+        progress_bar.progress(progress.fraction or 0.0, text=text)
+
+    return report
+
+
+def load_existing_store(index_path):
+    loaded = registry.vector_store(index_path, vector_store_manager)
+    if loaded is None:
+        raise RuntimeError(f"No vector store could be loaded from {index_path}")
+    st.session_state.vector_store_path = loaded.index_path
+
+
 def process_documents():
     try:
         with st.spinner("🔄 Loading and indexing documents..."):
-            if st.session_state.document_location == "Local":
-                if st.session_state.storage_type == "Old":
-                    st.session_state.vector_store = vector_store_manager.exist_in_faiss(st.session_state.local_folder_path)
-                    st.success("✅ Existing vector store loaded successfully.")
-                else:
-                    docs = document_loader.load_from_local(st.session_state.local_data_folder_path)
-                    chunks = semantic_chunker_nlp.chunk_and_enrich(docs)
-                    storage_path = os.path.join(st.session_state.local_folder_path, str(uuid4()))
-                    os.makedirs(storage_path, exist_ok=True)
-                    st.session_state.vector_store = vector_store_manager.store_in_faiss(chunks, storage_path)
-                    st.success(f"✅ Documents processed and indexed successfully from Local folder in folder : {storage_path}")
-            else:
-                if st.session_state.storage_type == "Old":
-                    st.session_state.vector_store = vector_store_manager.exist_in_faiss(st.session_state.local_folder_path)
-                    st.success("✅ Loaded vector store from Google Drive.")
+            with tracer.span("ingestion", source=st.session_state.document_location, storage=st.session_state.storage_type) as trace:
+                if st.session_state.document_location == "Local":
+                    if st.session_state.storage_type == "Old":
+                        load_existing_store(st.session_state.local_folder_path)
+                        st.success("✅ Existing vector store loaded successfully.")
+                    else:
+                        storage_path = vector_store_manager.store_path_for(
+                            st.session_state.local_folder_path, st.session_state.local_data_folder_path
+                        )
+                        with registry.store_lock(storage_path):
+                            vector_store = vector_store_manager.sync_folder(
+                                st.session_state.local_data_folder_path, storage_path, document_loader, semantic_chunker_nlp,
+                                on_progress=progress_reporter()
+                            )
+                            if not vector_store:
+                                raise RuntimeError(
+                                    f"Vector store sync failed for {st.session_state.local_data_folder_path}; "
+                                    "finished batches are checkpointed, load again to resume"
+                                )
+                            report = vector_store_manager.last_sync_report
+                            loaded = registry.put_vector_store(storage_path, vector_store_manager, vector_store)
+                        st.session_state.vector_store_path = loaded.index_path
+                        st.success(
+                            f"✅ Documents synced from Local folder in folder : {storage_path} "
+                            f"({len(report['added'])} added, {len(report['updated'])} updated, {len(report['removed'])} removed)"
+                        )
                 else:
-                    docs = load_document_from_drive(st.session_state.drive_folder_id)
-                    chunks = semantic_chunker_nlp.chunk_and_enrich(docs)
-                    storage_path = os.path.join(st.session_state.local_folder_path, str(uuid4()))
-                    os.makedirs(storage_path, exist_ok=True)
-                    st.session_state.vector_store = vector_store_manager.store_in_faiss(chunks, storage_path)
-                    st.success(f"✅ Documents processed and indexed successfully from Google Drive in folder : {st.session_state.local_folder_path}")
+                    if st.session_state.storage_type == "Old":
+                        load_existing_store(st.session_state.local_folder_path)
+                        st.success("✅ Loaded vector store from Google Drive.")
+                    else:
+                        # Only new or changed Drive files are downloaded; the cached folder then syncs like a local one.
+                        drive_report = drive_sync.sync(st.session_state.drive_folder_id)
+                        # A stable path per Drive folder lets a failed run resume from its checkpoints.
+                        storage_path = vector_store_manager.store_path_for(
+                            st.session_state.local_folder_path, st.session_state.drive_folder_id
+                        )
+                        with registry.store_lock(storage_path):
+                            vector_store = vector_store_manager.sync_folder(
+                                drive_report.folder_path, storage_path, document_loader, semantic_chunker_nlp,
+                                on_progress=progress_reporter()
+                            )
+                            if not vector_store:
+                                raise RuntimeError(
+                                    "Vector store creation failed for the Google Drive documents; "
+                                    "finished batches are checkpointed, load again to resume"
+                                )
+                            loaded = registry.put_vector_store(storage_path, vector_store_manager, vector_store)
+                        st.session_state.vector_store_path = loaded.index_path
+                        st.success(
+                            f"✅ Documents synced from Google Drive in folder : {storage_path} "
+                            f"({len(drive_report.added)} added, {len(drive_report.updated)} updated, {len(drive_report.removed)} removed)"
+                        )
+        render_timings(trace.breakdown())
     except Exception as e:
         st.error(f"❌ Failed to load documents: {str(e)}")
     finally:
@@ -118,121 +193,192 @@ def process_documents():
 if st.session_state.load_document:
     process_documents()
 
-if st.session_state.chat_history:
-    for idx, chat in enumerate(st.session_state.chat_history):
-        st.chat_message("user").markdown(chat["user_query"])
 
-        with st.expander(f"🧠 View Transformed Queries", expanded=False):
-            st.markdown(chat["processed_queries"])
+def context_summary(report):
+    prompts = f" across {report['parts']} per-question prompts" if report.get("parts") else ""
+    return (
+        f"🧮 Context: {report['tokens_after']} tokens{prompts}, {report['tokens_saved']} saved versus the raw retrieval "
+        f"({report['duplicates']} duplicate, {report['near_duplicates']} near-duplicate, "
+        f"{report['dropped_for_budget']} over-budget passages dropped)"
+    )
+
 
-        with st.expander(f"📚 View Retrieved Contexts", expanded=False):
-            for i, q in enumerate(chat["contexts"]):
-                st.markdown(f"**Q{i+1}:** {q['question']}")
-                st.markdown(f"**Context:**\n\n{q['context']}")
+def grounding_caption(summary):
+    caption = f"🔎 Groundedness pre-check: {summary['verdict']} (lowest sentence support {summary['score']:.2f})"
+    if summary["escalated"]:
+        caption += f", {len(summary['escalated'])} sentence(s) sent to the LLM validator"
+    return caption
 
-                if 'rerank_scores' in q and q['rerank_scores']:
-                    st.markdown(f"**Reranking Scores:** {', '.join(q['rerank_scores'])}")
 
-        with st.expander(f"🛡️  View Response Validation Result", expanded=False):
-            st.markdown(chat["validation"])
+def part_caption(part):
+    caption = f"Q{part['index'] + 1}: {part['validation']}"
+    if part["attempts"] > 1:
+        caption += f" after {part['attempts']} attempts"
+    if part.get("error"):
+        caption += f" ({part['error']})"
+    if part.get("grounding"):
+        caption += f" · {grounding_caption(part['grounding'])}"
+    return caption
 
-        st.chat_message("assistant").markdown(chat["response"])
+
+def render_chat_details(chat):
+    with st.expander(f"🧠 View Transformed Queries", expanded=False):
+        st.markdown(chat["processed_queries"])
+
+    with st.expander(f"📚 View Retrieved Contexts", expanded=False):
+        for i, q in enumerate(chat["contexts"]):
+            st.markdown(f"**Q{i+1}:** {q['question']}")
+            st.markdown(f"**Context:**\n\n{q['context']}")
+
+            if 'rerank_scores' in q and q['rerank_scores']:
+                st.markdown(f"**Reranking Scores:** {', '.join(q['rerank_scores'])}")
+        if chat.get("context_report"):
+            st.caption(context_summary(chat["context_report"]))
+
+    with st.expander(f"🛡️  View Response Validation Result", expanded=False):
+        st.markdown(chat["validation"])
+        for part in chat.get("parts", []):
+            st.caption(part_caption(part))
+        if chat.get("grounding"):
+            st.caption(grounding_caption(chat["grounding"]))
+
+    st.chat_message("assistant").markdown(chat["response"])
+
+    if chat.get("timings"):
+        render_timings(chat["timings"])
+
+
+if st.session_state.chat_history:
+    for idx, chat in enumerate(st.session_state.chat_history):
+        st.chat_message("user").markdown(chat["user_query"])
+        render_chat_details(chat)
 
 user_query = st.chat_input("💬 Ask your question here")
 if user_query:
     st.chat_message("user").markdown(user_query)
 
-    if not st.session_state.vector_store:
-        st.chat_message("assistant").warning("⚠️ Vector store not available. Please load documents first.")
-    else:
-        try:
-            processed_queries = query_transformer.process_query(user_query)
-
-            with st.expander("🧠 View Transformed Queries", expanded=False):
-                st.markdown(processed_queries)
-
-            retriever = st.session_state.vector_store.as_retriever(search_type="mmr", search_kwargs={"k": 10})
-            final_query_context = []
-
-            for key, query in processed_queries.items():
-                # top_docs = retriever.get_relevant_documents(query)
-
-                # reranked_docs = reranking_process.rerank(query, top_docs)
-                # selected_docs = reranked_docs[:st.session_state.rerank_top_k]
-                # context_docs = [doc for doc, score in selected_docs]
-                # rerank_scores = [f"{score:.4f}" for doc, score in selected_docs]
-
-                # context_str = "\n\n".join([doc.page_content for doc in top_docs[:5]])
-                # final_query_context.append({"question": query, "context": f"[{context_str}]"})
-                # context_str = "\n\n".join([doc.page_content for doc in context_docs])
-                # final_query_context.append({
-                #             "question": query, 
-                #             "context": f"[{context_str}]",
-                #             "rerank_scores": rerank_scores
-                #         })
-
-                 # Get initial documents from vector store
-                top_docs = retriever.get_relevant_documents(query)
-                
-                # Apply reranking if enabled
-                if st.session_state.use_reranking:
-                    with st.spinner(f"🔄 Reranking documents for query: {key}..."):
-                        reranked_docs = reranking_process.rerank(query, top_docs)
-                        
-                        # Extract top-k documents and their scores
-                        selected_docs = reranked_docs[:st.session_state.rerank_top_k]
-                        context_docs = [doc for doc, score in selected_docs]
-                        rerank_scores = [f"{score:.4f}" for doc, score in selected_docs]
-                        
-                        context_str = "\n\n".join([doc.page_content for doc in context_docs])
-                        final_query_context.append({
-                            "question": query, 
-                            "context": f"[{context_str}]",
-                            "rerank_scores": rerank_scores
-                        })
-                else:
-                    # Use original top-5 without reranking
-                    context_str = "\n\n".join([doc.page_content for doc in top_docs[:5]])
-                    final_query_context.append({
-                        "question": query, 
-                        "context": f"[{context_str}]",
-                        "rerank_scores": None
-                    })
-
-            with st.expander("📚 View Retrieved Contexts", expanded=False):
-                for i, q in enumerate(final_query_context):
-                    st.markdown(f"**Q{i+1}:** {q['question']}")
-                    st.markdown(f"**Context:**\n\n{q['context']}")
-
-                    if st.session_state.use_reranking and q.get('rerank_scores'):
-                        st.markdown(f"**Reranking Scores:** {', '.join(q['rerank_scores'])}")
-
-            query_context_string = ""
-            for idx, item in enumerate(final_query_context):
-                query_context_string += f"\nQuestion {idx+1}: {item['question']}\n\nContext {idx+1}:\n{item['context']}\n"
-
-            # Get response and validate
-            response, system_prompt = talk_to_anthropic(query_context_string)
-            validation_result = validate_response_with_claude(query_context_string, response)
-
-            with st.expander("🛡️ View Response Validation Result", expanded=False):
-                st.markdown(validation_result)
-
-            if validation_result != "Valid":
-                st.warning("⚠️ Response validation failed. Regenerating...")
-                response, _ = talk_to_anthropic(query_context_string)
-
-            # Show assistant response
-            st.chat_message("assistant").markdown(response)
-
-            # Save interaction in session history
-            st.session_state.chat_history.append({
-                "user_query": user_query,
-                "processed_queries": processed_queries,
-                "contexts": final_query_context,
-                "response": response,
-                "validation": validation_result
-            })
-
-        except Exception as e:
-            st.chat_message("assistant").error(f"❌ Error during processing: {str(e)}")
+    chat = None
+    with tracer.span("question", hybrid=st.session_state.use_hybrid_retrieval, reranking=st.session_state.use_reranking) as trace:
+        loaded_store = (
+            registry.vector_store(st.session_state.vector_store_path, vector_store_manager)
+            if st.session_state.vector_store_path else None
+        )
+        if not loaded_store:
+            st.chat_message("assistant").warning("⚠️ Vector store not available. Please load documents first.")
+        else:
+            store_version = loaded_store.version
+            # Answers are only reused under the retrieval settings they were produced with
+            retrieval_settings = loaded_store.query_cache.settings_key(
+                hybrid=st.session_state.use_hybrid_retrieval,
+                reranking=st.session_state.use_reranking,
+                rerank_top_k=st.session_state.rerank_top_k
+            )
+            with tracer.span("query_cache") as cache_span:
+                cached_chat = loaded_store.query_cache.get(user_query, store_version, retrieval_settings)
+                cache_span.set(hit=bool(cached_chat), level=cached_chat["cache_level"] if cached_chat else "miss")
+
+            if cached_chat:
+                render_chat_details(cached_chat)
+                st.caption(f"⚡ Served from the {cached_chat['cache_level']} query cache")
+                chat = {**cached_chat, "user_query": user_query}
+                st.session_state.chat_history.append(chat)
+            else:
+                try:
+                    processed_queries = query_transformer.process_query(user_query)
+
+                    with st.expander("🧠 View Transformed Queries", expanded=False):
+                        st.markdown(processed_queries)
+
+                    with st.spinner("🔄 Retrieving context for all transformed queries..."):
+                        final_query_context = retrieval_orchestrator.retrieve(
+                            loaded_store.vector_store,
+                            processed_queries,
+                            use_reranking=st.session_state.use_reranking,
+                            rerank_top_k=st.session_state.rerank_top_k,
+                            lexical_index=loaded_store.lexical_index if st.session_state.use_hybrid_retrieval else None,
+                            term_index=loaded_store.term_index
+                        )
+
+                    # Each sub-question gets its own context, without repeated chunks and within a per-part token budget
+                    assembled = context_assembler.assemble_parts(final_query_context)
+                    final_query_context = assembled.contexts
+
+                    with st.expander("📚 View Retrieved Contexts", expanded=False):
+                        for i, q in enumerate(final_query_context):
+                            st.markdown(f"**Q{i+1}:** {q['question']}")
+                            st.markdown(f"**Context:**\n\n{q['context']}")
+
+                            if st.session_state.use_reranking and q.get('rerank_scores'):
+                                st.markdown(f"**Reranking Scores:** {', '.join(q['rerank_scores'])}")
+                        st.caption(context_summary(assembled.report))
+
+                    # Every sub-question is answered and validated on its own, in parallel; only failing parts are regenerated
+                    with st.chat_message("assistant"):
+                        placeholders = [st.empty() for _ in final_query_context]
+                    texts = [""] * len(final_query_context)
+                    parts = [None] * len(final_query_context)
+                    started = time.perf_counter()
+                    first_token = None
+                    for event in answerer.stream(final_query_context, embed_model=loaded_store.vector_store.embedding_function):
+                        if event.kind == "token":
+                            first_token = first_token if first_token is not None else time.perf_counter() - started
+                            texts[event.index] += event.text
+                        elif event.kind == "restart":
+                            texts[event.index] = ""
+                        else:
+                            parts[event.index] = event.part
+                            texts[event.index] = event.part.text
+                        placeholders[event.index].markdown(texts[event.index])
+                    generation_metrics = {"time_to_first_token": first_token, "total_time": time.perf_counter() - started}
+                    st.caption(
+                        f"⏱️ First token in {generation_metrics['time_to_first_token'] or 0:.2f}s, "
+                        f"full answer in {generation_metrics['total_time'] or 0:.2f}s"
+                    )
+
+                    failed = [part for part in parts if not part.valid]
+                    validation_result = "Valid" if not failed else f"Invalid (part {', '.join(str(part.index + 1) for part in failed)})"
+                    part_summaries = [
+                        {
+                            "index": part.index,
+                            "question": part.question,
+                            "validation": part.validation,
+                            "grounding": part.grounding,
+                            "attempts": part.attempts,
+                            "error": part.error,
+                        }
+                        for part in parts
+                    ]
+
+                    with st.expander("🛡️ View Response Validation Result", expanded=False):
+                        st.markdown(validation_result)
+                        for part in part_summaries:
+                            st.caption(part_caption(part))
+
+                    if failed:
+                        st.warning("⚠️ Some parts of the answer could not be validated within the retry budget.")
+
+                    response = "\n\n".join(part.text for part in parts)
+
+                    # Save interaction in session history
+                    chat = {
+                        "user_query": user_query,
+                        "processed_queries": processed_queries,
+                        "contexts": final_query_context,
+                        "response": response,
+                        "context_report": assembled.report,
+                        "validation": validation_result,
+                        "parts": part_summaries,
+                        "generation_metrics": generation_metrics
+                    }
+                    st.session_state.chat_history.append(chat)
+
+                    # Only validated answers are reused for repeated questions
+                    if validation_result == "Valid":
+                        loaded_store.query_cache.put(user_query, store_version, chat, retrieval_settings)
+
+                except Exception as e:
+                    st.chat_message("assistant").error(f"❌ Error during processing: {str(e)}")
+
+    if chat is not None:
+        chat["timings"] = trace.breakdown()
+        render_timings(chat["timings"])
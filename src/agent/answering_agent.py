@@ -0,0 +1,167 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from src.agent.checking_agent import validate_with_precheck
+from src.agent.generative_agent import GenerationStream
+from src.services.context_assembler import ContextAssembler
+from src.services.groundedness import BORDERLINE, GroundednessChecker
+from src.services.tracing import get_tracer, propagate
+
+
+@dataclass
+class PartAnswer:
+    """Final answer to one sub-question, with how it was validated."""
+
+    index: int
+    question: str
+    text: str
+    validation: str
+    grounding: dict = field(default_factory=dict)
+    attempts: int = 1
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def valid(self) -> bool:
+        return self.validation == "Valid"
+
+
+@dataclass
+class AnswerEvent:
+    """
+    Progress of one part: "token" carries streamed text, "restart" means the part
+    failed validation and is being regenerated, "done" carries the PartAnswer.
+    """
+
+    kind: str
+    index: int
+    text: str = ""
+    part: Optional[PartAnswer] = None
+
+
+class _RetryBudget:
+    def __init__(self, retries: int):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class PerQuestionAnswerer:
+    """
+    Answers and validates every (question, context) pair on its own, concurrently.
+
+    Each sub-question is generated from its own context, checked with the local
+    groundedness pre-check (escalating to the LLM validator only when
+    borderline) and, if it fails, regenerated alone. Regenerations draw from a
+    `retry_budget` shared by all parts of the question, so one stubborn part
+    cannot multiply the cost; a part still failing when the budget is spent
+    keeps its last answer and validation result. The whole answer takes about as
+    long as its slowest part instead of the sum of all parts plus a full redo.
+
+    `stream` yields AnswerEvents in the calling thread, so a UI can render the
+    parts' tokens as they arrive.
+    """
+
+    def __init__(
+        self,
+        checker: GroundednessChecker,
+        max_workers: int = 4,
+        retry_budget: int = 2,
+        retry_temperature: float = 0.0,
+        client=None
+    ):
+        self.checker = checker
+        self.max_workers = max(1, max_workers)
+        self.retry_budget = retry_budget
+        self.retry_temperature = retry_temperature
+        self.client = client
+
+    @classmethod
+    def from_env(cls, checker: GroundednessChecker) -> "PerQuestionAnswerer":
+        return cls(
+            checker,
+            max_workers=int(os.getenv("ANSWER_MAX_WORKERS", "4")),
+            retry_budget=int(os.getenv("ANSWER_RETRY_BUDGET", "2")),
+        )
+
+    def _answer_part(
+        self,
+        index: int,
+        part: dict,
+        embed_model: Optional[Embeddings],
+        budget: _RetryBudget,
+        events: "queue.Queue[AnswerEvent]"
+    ) -> None:
+        start = time.perf_counter()
+        context = ContextAssembler.format_context([part], start=index)
+        passages = [passage["text"] for passage in part.get("passages") or []]
+        attempts, text, validation, grounding = 0, "", "Invalid", {}
+        try:
+            with get_tracer().span("answer_part", index=index) as span:
+                while True:
+                    attempts += 1
+                    if attempts > 1:
+                        events.put(AnswerEvent("restart", index))
+                    generation = GenerationStream(
+                        context, client=self.client, temperature=0.4 if attempts == 1 else self.retry_temperature
+                    )
+                    for token in generation:
+                        events.put(AnswerEvent("token", index, text=token))
+                    text = generation.text
+
+                    result = self.checker.check(text, passages, embed_model=embed_model)
+                    validation = validate_with_precheck(context, text, result)
+                    grounding = {
+                        "verdict": result.verdict,
+                        "score": round(result.score, 3),
+                        "escalated": [item.sentence for item in result.unsupported] if result.verdict == BORDERLINE else [],
+                    }
+                    if validation == "Valid" or not budget.take():
+                        break
+                span.set(attempts=attempts, validation=validation, verdict=grounding["verdict"])
+            part_answer = PartAnswer(index, part["question"], text, validation, grounding, attempts, time.perf_counter() - start)
+        except Exception as e:
+            part_answer = PartAnswer(
+                index, part["question"], text, "Error", grounding, attempts, time.perf_counter() - start, error=str(e)
+            )
+        events.put(AnswerEvent("done", index, part=part_answer))
+
+    def stream(self, contexts: List[dict], embed_model: Optional[Embeddings] = None) -> Iterator[AnswerEvent]:
+        """
+        Answers all sub-questions of `contexts` in parallel, yielding their events
+        as they happen. Every context must be complete on its own, as built by
+        `ContextAssembler.assemble_parts`. Ends after every part's "done" event; a
+        part that raised is reported with validation "Error".
+        """
+        parts = list(contexts)
+        if not parts:
+            return
+        events: "queue.Queue[AnswerEvent]" = queue.Queue()
+        budget = _RetryBudget(self.retry_budget)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(parts))) as executor:
+            for index, part in enumerate(parts):
+                executor.submit(propagate(self._answer_part), index, part, embed_model, budget, events)
+            remaining = len(parts)
+            while remaining:
+                event = events.get()
+                if event.kind == "done":
+                    remaining -= 1
+                yield event
+
+    def answer(self, contexts: List[dict], embed_model: Optional[Embeddings] = None) -> List[PartAnswer]:
+        """Non-streaming variant of `stream`: the finished parts in sub-question order."""
+        parts = [event.part for event in self.stream(contexts, embed_model) if event.kind == "done"]
+        return sorted(parts, key=lambda part: part.index)
@@ -2,7 +2,9 @@
 
 import os
 
-from anthropic import AnthropicBedrock
+from src.agent.llm_gateway import get_gateway
+from src.services.groundedness import GROUNDED, UNGROUNDED
+from src.services.tracing import get_tracer
 
 
 def validate_response_with_claude(context, generated_response):
@@ -27,24 +29,61 @@ Generated Response:
 {generated_response}
 """
 
-    # Load AWS credentials and config from environment
-    aws_access_key = os.getenv("AWS_ACCESS_KEY")
-    aws_secret_key = os.getenv("AWS_SECRET_KEY")
-    aws_region = os.getenv("AWS_REGION")
+    return _ask_validator(validation_prompt)
+
+
+def _ask_validator(validation_prompt):
     aws_model = os.getenv("AWS_MODEL")  # e.g. "anthropic.claude-3-sonnet-20240229"
 
-    # Initialize Claude (Anthropic) client
-    client = AnthropicBedrock(
-        aws_access_key=aws_access_key,
-        aws_secret_key=aws_secret_key,
-        aws_region=aws_region
-    )
+    with get_tracer().span("validation") as span:
+        message = get_gateway().create_message(
+            purpose="validation",
+            model=aws_model,
+            max_tokens=200,
+            temperature=0.0,
+            messages=[{"role": "user", "content": validation_prompt.strip()}]
+        )
+        result = message.content[0].text.strip()
+        span.set(result=result)
 
-    message = client.messages.create(
-        model=aws_model,
-        max_tokens=200,
-        temperature=0.0,
-        messages=[{"role": "user", "content": validation_prompt.strip()}]
-    )
+    return result
+
+
+def validate_sentences_with_claude(evidence, sentences):
+    """Asks the validator about the given answer sentences only, against their best supporting passages."""
+    statements = "\n".join(f"- {sentence}" for sentence in sentences)
+    validation_prompt = f"""
+You are a critical and precise evaluator.
+
+Your task is to check whether each of the following statements is factually supported by the given context passages.
 
-    return message.content[0].text.strip()
+Instructions:
+- If every statement is supported by the passages, respond with: "Valid".
+- If any statement contains unsupported or made-up content, respond with: "Invalid".
+- Do NOT explain or include anything other than the word "Valid" or "Invalid".
+
+Context Passages:
+{evidence}
+
+Statements:
+{statements}
+"""
+    return _ask_validator(validation_prompt)
+
+
+def validate_with_precheck(context, generated_response, grounding=None):
+    """
+    Validates a response using the local groundedness pre-check when available:
+    grounded answers are accepted and ungrounded ones rejected without an LLM
+    call, and borderline ones send only their unsupported sentences to the
+    validator. Without a pre-check result the whole response is validated.
+    """
+    if grounding is None:
+        return validate_response_with_claude(context, generated_response)
+    if grounding.verdict == GROUNDED:
+        return "Valid"
+    if grounding.verdict == UNGROUNDED:
+        return "Invalid"
+    return validate_sentences_with_claude(
+        grounding.evidence_context(), [item.sentence for item in grounding.unsupported]
+    )
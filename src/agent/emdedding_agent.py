@@ -1,11 +1,11 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-import os
+from langchain_core.embeddings import Embeddings
 
-def embedding_process() -> (GoogleGenerativeAIEmbeddings | None):
+from src.services.embedding_cache import get_shared_embeddings
+
+def embedding_process() -> (Embeddings | None):
     try:
         print("Embedding running...")
-        embedding_model = os.getenv("EMBEDDED_MODEL")
-        embeddings: GoogleGenerativeAIEmbeddings = GoogleGenerativeAIEmbeddings(model=embedding_model)
+        embeddings: Embeddings = get_shared_embeddings()
         return embeddings
     except Exception as error:
         return None
\ No newline at end of file
@@ -1,5 +1,9 @@
 import os
-from anthropic import AnthropicBedrock
+import time
+from typing import Iterator, List, Optional
+
+from src.agent.llm_gateway import LLMGateway, get_gateway
+from src.services.tracing import get_tracer
 
 
 class BedrockClient:
@@ -8,14 +12,12 @@ class BedrockClient:
 
         self.model = model
         self.max_token = max_token
-        self.client = AnthropicBedrock(
-            aws_access_key=aws_access_key,
-            aws_secret_key=aws_secret_key,
-            aws_region=aws_region
-        )
+        self.gateway = get_gateway(aws_access_key, aws_secret_key, aws_region)
+        self.client = self.gateway.client
 
     def create_message(self, chat_history: list[dict[str, str]]):
-        message = self.client.messages.create(
+        message = self.gateway.create_message(
+            purpose="chat",
             model=self.model,
             max_tokens=self.max_token,
             messages=chat_history
@@ -63,9 +65,8 @@ class BedrockClient:
 #     return message.content[0].text, system_prompt
 
 
-def talk_to_anthropic(context):
-
-    system_prompt = f"""
+def build_generation_prompt(context: str) -> str:
+    return f"""
 You are a helpful and concise AI assistant. Your task is to generate informative and structured answers based solely on the paired context for each user question.
 
 Instructions:
@@ -85,24 +86,83 @@ Now process the following question-context pairs:
 {context}
 """
 
+
+def talk_to_anthropic(context):
+
+    system_prompt = build_generation_prompt(context)
+
     # print(system_prompt)
-    aws_access_key = os.getenv("AWS_ACCESS_KEY")
-    aws_secret_key = os.getenv("AWS_SECRET_KEY")
-    aws_region = os.getenv("AWS_REGION")
     aws_model = os.getenv("AWS_MODEL")
 
-    client = AnthropicBedrock(
-        aws_access_key=aws_access_key,
-        aws_secret_key=aws_secret_key,
-        aws_region=aws_region
-    )
-
-    message = client.messages.create(
-        model=aws_model,
-        max_tokens=5000,
-        temperature=0.4,
-        # messages=chat_history + [{"role": "user", "content": system_prompt}],
-        messages=[{"role": "user", "content": system_prompt}],
-    )
-
-    return message.content[0].text, system_prompt
\ No newline at end of file
+    with get_tracer().span("generation"):
+        message = get_gateway().create_message(
+            purpose="generation",
+            model=aws_model,
+            max_tokens=5000,
+            temperature=0.4,
+            # messages=chat_history + [{"role": "user", "content": system_prompt}],
+            messages=[{"role": "user", "content": system_prompt}],
+        )
+
+    return message.content[0].text, system_prompt
+
+
+class GenerationStream:
+    """
+    Iterable over the answer tokens as they arrive from the model.
+
+    Records time to first token and total generation time once iterated. Requests go
+    through the shared LLM gateway; any client exposing `messages.stream(**kwargs)` as
+    a context manager with a `text_stream` iterator can be injected instead, e.g. a
+    local fake for tests.
+    """
+
+    def __init__(self, context: str, client=None, model: Optional[str] = None, max_tokens: int = 5000, temperature: float = 0.4):
+        self.system_prompt = build_generation_prompt(context)
+        self.gateway = LLMGateway(client=client) if client else get_gateway()
+        self.model = model or os.getenv("AWS_MODEL")
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.time_to_first_token: Optional[float] = None
+        self.total_time: Optional[float] = None
+        self._parts: List[str] = []
+
+    def __iter__(self) -> Iterator[str]:
+        # A generator cannot hold a `with` span across yields, so the span is ended explicitly.
+        span = get_tracer().start_span("generation", streamed=True)
+        start = time.perf_counter()
+        error = None
+        try:
+            with self.gateway.stream_message(
+                purpose="generation",
+                span=span,
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                messages=[{"role": "user", "content": self.system_prompt}],
+            ) as stream:
+                for text in stream.text_stream:
+                    if self.time_to_first_token is None:
+                        self.time_to_first_token = time.perf_counter() - start
+                        span.set(time_to_first_token_ms=round(self.time_to_first_token * 1000, 1))
+                    self._parts.append(text)
+                    yield text
+            self.total_time = time.perf_counter() - start
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            span.end(error=error if isinstance(error, Exception) else None)
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def metrics(self) -> dict:
+        return {"time_to_first_token": self.time_to_first_token, "total_time": self.total_time}
+
+
+def stream_from_anthropic(context: str, client=None) -> GenerationStream:
+    """Streaming variant of talk_to_anthropic; iterate the result to receive tokens."""
+    return GenerationStream(context, client=client)
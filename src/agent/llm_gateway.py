@@ -0,0 +1,207 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple, TypeVar
+
+from src.services.tracing import Span, current_span
+
+T = TypeVar("T")
+
+# Throttling and transient server errors worth retrying (529 is Anthropic's "overloaded").
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504, 529}
+
+
+class LLMGateway:
+    """
+    Shared entry point for Bedrock (Anthropic) calls.
+
+    Reuses one client with a pooled HTTP connection, caps the number of in-flight
+    requests with a semaphore, retries throttled and transient failures with
+    jittered exponential backoff, and records token usage and latency per call.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        max_in_flight: int = 8,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_connections: int = 20,
+        aws_access_key: Optional[str] = None,
+        aws_secret_key: Optional[str] = None,
+        aws_region: Optional[str] = None
+    ):
+        if client is None:
+            import httpx
+            from anthropic import AnthropicBedrock
+
+            client = AnthropicBedrock(
+                aws_access_key=aws_access_key,
+                aws_secret_key=aws_secret_key,
+                aws_region=aws_region,
+                max_retries=0,
+                http_client=httpx.Client(
+                    limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+                    timeout=httpx.Timeout(600.0, connect=10.0)
+                )
+            )
+        self.client = client
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+        self._stats_lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self.recent_calls = deque(maxlen=1000)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        from anthropic import APIConnectionError, APIStatusError
+
+        if isinstance(error, APIConnectionError):
+            return True
+        return isinstance(error, APIStatusError) and error.status_code in RETRYABLE_STATUS_CODES
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _with_retries(self, fn: Callable[[], T]) -> Tuple[T, int]:
+        attempt = 0
+        while True:
+            try:
+                return fn(), attempt
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    e.llm_retries = attempt
+                    raise
+                delay = self._backoff(attempt)
+                print(f"[WARN] LLM call failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def _record(
+        self,
+        purpose: str,
+        latency: float,
+        retries: int,
+        usage=None,
+        error: Optional[Exception] = None,
+        span: Optional[Span] = None
+    ) -> None:
+        record = {
+            "purpose": purpose,
+            "latency": latency,
+            "retries": retries,
+            "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+            "error": error.__class__.__name__ if error else None,
+        }
+        with self._stats_lock:
+            self.recent_calls.append(record)
+            totals = self._totals.setdefault(purpose, {
+                "calls": 0, "errors": 0, "retries": 0, "input_tokens": 0, "output_tokens": 0, "latency": 0.0
+            })
+            totals["calls"] += 1
+            totals["errors"] += 1 if error else 0
+            totals["retries"] += retries
+            totals["input_tokens"] += record["input_tokens"]
+            totals["output_tokens"] += record["output_tokens"]
+            totals["latency"] += latency
+
+        span = span or current_span()
+        if span is not None:
+            span.add(
+                llm_calls=1,
+                llm_retries=retries,
+                input_tokens=record["input_tokens"],
+                output_tokens=record["output_tokens"]
+            )
+
+    def create_message(self, purpose: str = "default", **kwargs):
+        """Calls `messages.create(**kwargs)` through the concurrency limit and retry policy."""
+        with self._semaphore:
+            start = time.perf_counter()
+            try:
+                message, retries = self._with_retries(lambda: self.client.messages.create(**kwargs))
+            except Exception as e:
+                self._record(purpose, time.perf_counter() - start, getattr(e, "llm_retries", 0), error=e)
+                raise
+            self._record(purpose, time.perf_counter() - start, retries, getattr(message, "usage", None))
+            return message
+
+    @contextmanager
+    def stream_message(self, purpose: str = "default", span: Optional[Span] = None, **kwargs) -> Iterator:
+        """
+        Opens `messages.stream(**kwargs)` through the concurrency limit and retry policy.
+
+        Only opening the stream is retried; the in-flight slot is held until the
+        caller leaves the context. Token usage is added to `span` (default: the
+        current span).
+        """
+        def open_stream():
+            manager = self.client.messages.stream(**kwargs)
+            return manager, manager.__enter__()
+
+        with self._semaphore:
+            start = time.perf_counter()
+            try:
+                (manager, stream), retries = self._with_retries(open_stream)
+            except Exception as e:
+                self._record(purpose, time.perf_counter() - start, getattr(e, "llm_retries", 0), error=e, span=span)
+                raise
+
+            error = None
+            try:
+                yield stream
+            except BaseException as e:
+                error = e
+                if not manager.__exit__(type(e), e, e.__traceback__):
+                    raise
+            else:
+                manager.__exit__(None, None, None)
+            finally:
+                snapshot = getattr(stream, "current_message_snapshot", None)
+                self._record(
+                    purpose, time.perf_counter() - start, retries,
+                    getattr(snapshot, "usage", None), error if isinstance(error, Exception) else None, span
+                )
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns per-purpose totals of calls, errors, retries, tokens and latency."""
+        with self._stats_lock:
+            return {purpose: dict(totals) for purpose, totals in self._totals.items()}
+
+
+_gateways: Dict[Tuple[Optional[str], Optional[str], Optional[str]], LLMGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(
+    aws_access_key: Optional[str] = None,
+    aws_secret_key: Optional[str] = None,
+    aws_region: Optional[str] = None
+) -> LLMGateway:
+    """
+    Returns the process-wide gateway for the given credentials (defaults to the
+    AWS_ACCESS_KEY / AWS_SECRET_KEY / AWS_REGION environment variables).
+    """
+    key = (
+        aws_access_key or os.getenv("AWS_ACCESS_KEY"),
+        aws_secret_key or os.getenv("AWS_SECRET_KEY"),
+        aws_region or os.getenv("AWS_REGION"),
+    )
+    with _gateways_lock:
+        if key not in _gateways:
+            _gateways[key] = LLMGateway(
+                aws_access_key=key[0],
+                aws_secret_key=key[1],
+                aws_region=key[2],
+                max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "8")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+                max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+            )
+        return _gateways[key]
@@ -2,7 +2,9 @@ import json
 import os
 import re
 from typing import Dict, Optional
-from anthropic import AnthropicBedrock
+
+from src.agent.llm_gateway import get_gateway
+from src.services.tracing import get_tracer
 
 
 class QueryTransformation:
@@ -14,7 +16,7 @@ class QueryTransformation:
     """
     
     def __init__(self):
-        self.client = AnthropicBedrock(
+        self.gateway = get_gateway(
             aws_access_key=self._get_env("AWS_ACCESS_KEY"),
             aws_secret_key=self._get_env("AWS_SECRET_KEY"),
             aws_region=self._get_env("AWS_REGION")
@@ -56,10 +58,14 @@ Query: {query}
         return None
 
     def process_query(self, query: str) -> Optional[Dict[str, str]]:
-        prompt = self._build_prompt(query)
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=5000,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return self._extract_json(response.content[0].text)
\ No newline at end of file
+        with get_tracer().span("query_transformation") as span:
+            prompt = self._build_prompt(query)
+            response = self.gateway.create_message(
+                purpose="query_transformation",
+                model=self.model,
+                max_tokens=5000,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            queries = self._extract_json(response.content[0].text)
+            span.set(sub_queries=len(queries) if queries else 0)
+            return queries
\ No newline at end of file
@@ -0,0 +1,201 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Optional
+
+import numpy as np
+
+INDEX_SPEC_FILE = "index_spec.json"
+
+INDEX_KINDS = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8")
+
+
+@dataclass
+class IndexSpec:
+    """
+    FAISS index configuration.
+
+    kind:
+        "flat"      exact IndexFlatL2 (langchain's default)
+        "ivf_flat"  inverted lists over full vectors, searched with `nprobe`
+        "ivf_pq"    inverted lists over product-quantized vectors (`pq_m` x `pq_nbits`);
+                    built as "ivf_flat" on fewer than 2**pq_nbits vectors
+        "hnsw"      HNSW graph over full vectors, searched with `ef_search`
+        "sq8"       8-bit scalar-quantized flat index
+    """
+
+    kind: str = "flat"
+    nlist: int = 1024
+    nprobe: int = 16
+    pq_m: int = 16
+    pq_nbits: int = 8
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    train_sample: int = 100_000
+
+    def __post_init__(self):
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{self.kind}', expected one of {INDEX_KINDS}")
+
+    def effective_nlist(self, n_vectors: int) -> int:
+        # FAISS wants ~39 training points per centroid; shrink nlist on small corpora.
+        return max(1, min(self.nlist, n_vectors // 39))
+
+    def effective_kind(self, n_vectors: int) -> str:
+        # Each PQ codebook needs 2**pq_nbits training points; below that, keep full vectors.
+        if self.kind == "ivf_pq" and n_vectors < 2 ** self.pq_nbits:
+            return "ivf_flat"
+        return self.kind
+
+    def min_training_vectors(self) -> int:
+        """Vectors to collect before an index of this kind is built; 0 if it needs no training."""
+        if self.kind in ("flat", "hnsw"):
+            return 0
+        if self.kind == "sq8":
+            return min(self.train_sample, 10_000)
+        return min(self.train_sample, 39 * self.nlist)
+
+    def factory_string(self, dim: int, n_vectors: int) -> str:
+        kind = self.effective_kind(n_vectors)
+        if kind == "flat":
+            return "Flat"
+        if kind == "ivf_flat":
+            return f"IVF{self.effective_nlist(n_vectors)},Flat"
+        if kind == "ivf_pq":
+            if dim % self.pq_m:
+                raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dim}")
+            return f"IVF{self.effective_nlist(n_vectors)},PQ{self.pq_m}x{self.pq_nbits}"
+        if kind == "hnsw":
+            return f"HNSW{self.hnsw_m},Flat"
+        return "SQ8"
+
+    def save(self, index_path: str) -> None:
+        with open(os.path.join(index_path, INDEX_SPEC_FILE), "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    @classmethod
+    def load(cls, index_path: str) -> "IndexSpec":
+        path = os.path.join(index_path, INDEX_SPEC_FILE)
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        known = {field.name for field in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    @classmethod
+    def from_env(cls) -> "IndexSpec":
+        return cls(
+            kind=os.getenv("FAISS_INDEX_KIND", "flat"),
+            nlist=int(os.getenv("FAISS_NLIST", "1024")),
+            nprobe=int(os.getenv("FAISS_NPROBE", "16")),
+            ef_search=int(os.getenv("FAISS_EF_SEARCH", "64")),
+        )
+
+
+def _ivf(index):
+    import faiss
+
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def prepare_index(index, spec: IndexSpec) -> None:
+    """
+    Applies query-time parameters and, for IVF indexes, a hashtable direct map so
+    vectors can be reconstructed (stored-vector reranking) and removed (sync).
+    """
+    import faiss
+
+    ivf = _ivf(index)
+    if ivf is not None:
+        ivf.nprobe = spec.nprobe
+        if ivf.direct_map.type == faiss.DirectMap.NoMap:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, "hnsw"):
+        hnsw_index.hnsw.efSearch = spec.ef_search
+
+
+def set_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+    """Tunes nprobe (IVF) and efSearch (HNSW) on a built index."""
+    import faiss
+
+    ivf = _ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = nprobe
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, "hnsw") and ef_search:
+        hnsw_index.hnsw.efSearch = ef_search
+
+
+def build_index(spec: IndexSpec, vectors: np.ndarray, seed: int = 0):
+    """
+    Creates an empty FAISS index for `spec`, trained on a sample of `vectors` when
+    the index type needs training. The caller adds the vectors afterwards.
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dim = vectors.shape
+    if spec.kind == "flat":
+        return faiss.IndexFlatL2(dim)
+    if spec.effective_kind(n_vectors) != spec.kind:
+        print(f"Only {n_vectors} vectors, fewer than the {2 ** spec.pq_nbits} a PQ codebook needs; building an ivf_flat index instead.")
+
+    index = faiss.index_factory(dim, spec.factory_string(dim, n_vectors), faiss.METRIC_L2)
+    hnsw_index = faiss.downcast_index(index)
+    if hasattr(hnsw_index, "hnsw"):
+        hnsw_index.hnsw.efConstruction = spec.ef_construction
+
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        sample_size = min(n_vectors, spec.train_sample)
+        sample = vectors[rng.choice(n_vectors, sample_size, replace=False)] if sample_size < n_vectors else vectors
+        print(f"Training {spec.kind} index on {sample_size} vectors...")
+        index.train(sample)
+
+    prepare_index(index, spec)
+    return index
+
+
+def evaluate_recall(index, exact_vectors: np.ndarray, query_vectors: np.ndarray, k: int = 10) -> dict:
+    """
+    Compares `index` against an exact flat index built from `exact_vectors`
+    (in the same positional order as `index`).
+
+    Returns:
+        recall@k, mean per-query latency of both indexes (ms) and their sizes in bytes.
+    """
+    import faiss
+
+    exact_vectors = np.ascontiguousarray(exact_vectors, dtype=np.float32)
+    query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    k = min(k, exact_vectors.shape[0])
+
+    flat = faiss.IndexFlatL2(exact_vectors.shape[1])
+    flat.add(exact_vectors)
+
+    start = time.perf_counter()
+    _, expected = flat.search(query_vectors, k)
+    flat_latency = (time.perf_counter() - start) / len(query_vectors)
+
+    start = time.perf_counter()
+    _, found = index.search(query_vectors, k)
+    ann_latency = (time.perf_counter() - start) / len(query_vectors)
+
+    hits = sum(len(set(row_expected) & set(row_found[row_found >= 0])) for row_expected, row_found in zip(expected, found))
+    return {
+        f"recall@{k}": hits / (k * len(query_vectors)),
+        "ann_latency_ms": ann_latency * 1000,
+        "flat_latency_ms": flat_latency * 1000,
+        "ann_bytes": int(faiss.serialize_index(index).size),
+        "flat_bytes": int(exact_vectors.nbytes),
+        "n_vectors": int(index.ntotal),
+        "n_queries": int(len(query_vectors)),
+    }
@@ -0,0 +1,127 @@
+import copy
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.services.tracing import propagate
+
+
+class BatchedSemanticChunker:
+    """
+    Semantic chunker that detects breakpoints for many texts at once.
+
+    It follows langchain_experimental's SemanticChunker (sentence split, buffered
+    sentence groups, cosine distance between neighbours, threshold on the distance
+    distribution), but the sentence groups of all texts are pooled into full-size
+    embedding batches that are sent concurrently, and the distances and thresholds
+    are computed per text with vectorized NumPy.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        breakpoint_threshold_type: str = "percentile",
+        breakpoint_threshold_amount: float = 95,
+        buffer_size: int = 1,
+        sentence_split_regex: str = r"(?<=[.?!])\s+",
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        min_chunk_size: Optional[int] = None
+    ):
+        if breakpoint_threshold_type not in ("percentile", "standard_deviation", "interquartile", "gradient"):
+            raise ValueError(f"Unsupported breakpoint threshold type: {breakpoint_threshold_type}")
+
+        self.embeddings = embeddings
+        self.breakpoint_threshold_type = breakpoint_threshold_type
+        self.breakpoint_threshold_amount = breakpoint_threshold_amount
+        self.buffer_size = buffer_size
+        self.sentence_split_pattern = re.compile(sentence_split_regex)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.min_chunk_size = min_chunk_size
+
+    def _combine_sentences(self, sentences: List[str]) -> List[str]:
+        combined = []
+        for i in range(len(sentences)):
+            before = sentences[max(0, i - self.buffer_size):i]
+            after = sentences[i + 1:i + 1 + self.buffer_size]
+            combined.append(" ".join(before + [sentences[i]] + after))
+        return combined
+
+    def _embed_all(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts in batches of `batch_size`, with up to `max_concurrency` batches in flight."""
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1 or self.max_concurrency <= 1:
+            results = [self.embeddings.embed_documents(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                results = list(executor.map(propagate(self.embeddings.embed_documents), batches))
+        return np.asarray([vector for batch in results for vector in batch], dtype=np.float32)
+
+    @staticmethod
+    def _neighbour_distances(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        unit = vectors / norms
+        return 1.0 - np.einsum("ij,ij->i", unit[:-1], unit[1:])
+
+    def _threshold(self, distances: np.ndarray) -> Tuple[float, np.ndarray]:
+        amount = self.breakpoint_threshold_amount
+        if self.breakpoint_threshold_type == "percentile":
+            return float(np.percentile(distances, amount)), distances
+        if self.breakpoint_threshold_type == "standard_deviation":
+            return float(np.mean(distances) + amount * np.std(distances)), distances
+        if self.breakpoint_threshold_type == "interquartile":
+            q1, q3 = np.percentile(distances, [25, 75])
+            return float(np.mean(distances) + amount * (q3 - q1)), distances
+        gradient = np.gradient(distances, range(0, len(distances)))
+        return float(np.percentile(gradient, amount)), gradient
+
+    def _group_sentences(self, sentences: List[str], distances: np.ndarray) -> List[str]:
+        threshold, breakpoint_array = self._threshold(distances)
+        chunks = []
+        start_index = 0
+        for index in np.flatnonzero(breakpoint_array > threshold):
+            combined_text = " ".join(sentences[start_index:index + 1])
+            if self.min_chunk_size is not None and len(combined_text) < self.min_chunk_size:
+                continue
+            chunks.append(combined_text)
+            start_index = index + 1
+        if start_index < len(sentences):
+            chunks.append(" ".join(sentences[start_index:]))
+        return chunks
+
+    def split_texts(self, texts: List[str]) -> List[List[str]]:
+        """Splits every text into semantic chunks, embedding all of them together."""
+        sentence_lists = [self.sentence_split_pattern.split(text) for text in texts]
+
+        pending = [
+            i for i, sentences in enumerate(sentence_lists)
+            if len(sentences) > 1 and not (self.breakpoint_threshold_type == "gradient" and len(sentences) == 2)
+        ]
+        combined = [self._combine_sentences(sentence_lists[i]) for i in pending]
+        vectors = self._embed_all([group for groups in combined for group in groups])
+
+        results = [list(sentences) for sentences in sentence_lists]
+        offset = 0
+        for i, groups in zip(pending, combined):
+            text_vectors = vectors[offset:offset + len(groups)]
+            offset += len(groups)
+            results[i] = self._group_sentences(sentence_lists[i], self._neighbour_distances(text_vectors))
+
+        return results
+
+    def split_text(self, text: str) -> List[str]:
+        return self.split_texts([text])[0]
+
+    def create_documents(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[Document]:
+        metadatas = metadatas or [{}] * len(texts)
+        return [
+            Document(page_content=chunk, metadata=copy.deepcopy(metadata))
+            for chunks, metadata in zip(self.split_texts(texts), metadatas)
+            for chunk in chunks
+        ]
@@ -1,62 +1,131 @@
-import spacy
-from typing import List
+from typing import Iterable, List, Optional
 from langchain_core.documents import Document
-from langchain_experimental.text_splitter import SemanticChunker, BreakpointThresholdType
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from src.services.batched_semantic_chunker import BatchedSemanticChunker
+from src.services.embedding_cache import get_shared_embeddings
+from src.services.tracing import get_tracer
+
+# spaCy components each metadata field depends on. "sentences" is handled separately
+# because it can come from either the parser or the lighter senter component.
+FEATURE_COMPONENTS = {
+    "entities": {"ner"},
+    "entity_labels": {"ner"},
+    "nouns": {"tagger", "attribute_ruler"},
+    "verbs": {"tagger", "attribute_ruler"},
+    "adjectives": {"tagger", "attribute_ruler"},
+    "noun_chunks": {"tagger", "attribute_ruler", "parser"},
+    "sentences": set(),
+    "word_count": set(),
+}
+
+
+def load_trimmed_pipeline(spacy_model: str, features: Iterable[str]):
+    """Loads a spaCy model with only the components the given features need."""
+    import spacy
+
+    features = list(features)
+    nlp = spacy.load(spacy_model)
+    required = set().union(*(FEATURE_COMPONENTS[name] for name in features))
+    if "sentences" in features and "parser" not in required:
+        required.add("senter" if "senter" in nlp.component_names else "parser")
+
+    if "tok2vec" in nlp.component_names:
+        listeners = set(getattr(nlp.get_pipe("tok2vec"), "listening_components", []))
+        if required & listeners:
+            required.add("tok2vec")
+
+    for name in nlp.component_names:
+        if name in required and name in nlp.disabled:
+            nlp.enable_pipe(name)
+        elif name not in required and name not in nlp.disabled:
+            nlp.disable_pipe(name)
+    return nlp
 
 
 class SemanticChunkerWithNLP:
     def __init__(
         self,
         embed_model=None,
-        model_name: str = "models/embedding-001",
+        model_name: Optional[str] = None,
         breakpoint_type: str = "percentile",
         breakpoint_amount: int = 85,
-        spacy_model: str = "en_core_web_sm"
-    ):  
-        
-        self.embed_model = embed_model or GoogleGenerativeAIEmbeddings(model=model_name)
-        self.chunker = SemanticChunker(
+        spacy_model: str = "en_core_web_sm",
+        features: Optional[Iterable[str]] = None,
+        n_process: int = 1,
+        nlp_batch_size: int = 64,
+        embedding_batch_size: int = 100,
+        max_concurrency: int = 4
+    ):
+        self.features = list(features) if features is not None else list(FEATURE_COMPONENTS)
+        unknown = [name for name in self.features if name not in FEATURE_COMPONENTS]
+        if unknown:
+            raise ValueError(f"Unknown NLP features: {unknown}")
+        self.n_process = n_process
+        self.nlp_batch_size = nlp_batch_size
+
+        self.embed_model = embed_model or get_shared_embeddings(model_name)
+        self.chunker = BatchedSemanticChunker(
             self.embed_model,
             breakpoint_threshold_type=breakpoint_type,
-            breakpoint_threshold_amount=breakpoint_amount
+            breakpoint_threshold_amount=breakpoint_amount,
+            batch_size=embedding_batch_size,
+            max_concurrency=max_concurrency
         )
-        self.nlp = spacy.load(spacy_model)
+        self.nlp = load_trimmed_pipeline(spacy_model, self.features)
 
     def _normalize_tokens(self, tokens: List[str]) -> List[str]:
         return list(set(
             token.lower().strip('.,:;!?()[]{}') for token in tokens if len(token) > 1
         ))
 
-    def _extract_nlp_features(self, text: str) -> dict:
-        doc = self.nlp(text)
-        return {
-            "entities": self._normalize_tokens([ent.text for ent in doc.ents]),
-            "entity_labels": list(set(ent.label_ for ent in doc.ents)),
-            "nouns": self._normalize_tokens([t.text for t in doc if t.pos_ == "NOUN" and not t.is_stop]),
-            "verbs": self._normalize_tokens([t.text for t in doc if t.pos_ == "VERB" and not t.is_stop]),
-            "adjectives": self._normalize_tokens([t.text for t in doc if t.pos_ == "ADJ"]),
-            "noun_chunks": self._normalize_tokens([chunk.text for chunk in doc.noun_chunks]),
-            "sentences": [sent.text.strip() for sent in doc.sents],
-            "word_count": len([t for t in doc if t.is_alpha])
+    def _features_from_doc(self, doc) -> dict:
+        extractors = {
+            "entities": lambda: self._normalize_tokens([ent.text for ent in doc.ents]),
+            "entity_labels": lambda: list(set(ent.label_ for ent in doc.ents)),
+            "nouns": lambda: self._normalize_tokens([t.text for t in doc if t.pos_ == "NOUN" and not t.is_stop]),
+            "verbs": lambda: self._normalize_tokens([t.text for t in doc if t.pos_ == "VERB" and not t.is_stop]),
+            "adjectives": lambda: self._normalize_tokens([t.text for t in doc if t.pos_ == "ADJ"]),
+            "noun_chunks": lambda: self._normalize_tokens([chunk.text for chunk in doc.noun_chunks]),
+            "sentences": lambda: [sent.text.strip() for sent in doc.sents],
+            "word_count": lambda: len([t for t in doc if t.is_alpha])
         }
+        return {name: extractors[name]() for name in self.features}
+
+    def _extract_nlp_features(self, text: str) -> dict:
+        return self._features_from_doc(self.nlp(text))
+
+    def _extract_nlp_features_batch(self, texts: List[str]) -> List[dict]:
+        """Runs the trimmed pipeline over all texts in one batched nlp.pipe pass."""
+        docs = self.nlp.pipe(texts, batch_size=self.nlp_batch_size, n_process=self.n_process)
+        return [self._features_from_doc(doc) for doc in docs]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """Semantically splits pages into chunk Documents carrying position metadata."""
+        chunks = []
+        with get_tracer().span("semantic_split", pages=len(documents)):
+            split_texts = self.chunker.split_texts([doc.page_content for doc in documents])
+
+        for doc, chunk_texts in zip(documents, split_texts):
+            for i, chunk_text in enumerate(chunk_texts):
+                chunks.append(Document(
+                    page_content=chunk_text,
+                    metadata={
+                        **doc.metadata,
+                        "chunk_index": i,
+                        "total_chunks": len(chunk_texts),
+                        "length": len(chunk_text),
+                        "source_id": f"{doc.metadata.get('source', 'unknown')}_p{doc.metadata.get('page', 'NA')}_c{i}"
+                    }
+                ))
+        return chunks
+
+    def enrich(self, chunks: List[Document]) -> List[Document]:
+        """Adds the NLP features to the chunk metadata in place."""
+        with get_tracer().span("nlp_enrich", chunks=len(chunks)):
+            features = self._extract_nlp_features_batch([chunk.page_content for chunk in chunks])
+        for chunk, chunk_features in zip(chunks, features):
+            chunk.metadata.update(chunk_features)
+        return chunks
 
     def chunk_and_enrich(self, documents: List[Document]) -> List[Document]:
-        enriched_chunks = []
-
-        for doc in documents:
-            chunks = self.chunker.create_documents([doc.page_content])
-
-            for i, chunk in enumerate(chunks):
-                enriched_metadata = {
-                    **doc.metadata,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "length": len(chunk.page_content),
-                    "source_id": f"{doc.metadata.get('source', 'unknown')}_p{doc.metadata.get('page', 'NA')}_c{i}"
-                }
-                enriched_metadata.update(self._extract_nlp_features(chunk.page_content))
-                chunk.metadata = enriched_metadata
-                enriched_chunks.append(chunk)
-
-        return enriched_chunks
+        return self.enrich(self.split_documents(documents))
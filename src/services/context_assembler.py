@@ -0,0 +1,251 @@
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Tuple
+
+from src.services.tracing import get_tracer
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Approximate LLM token count (Claude averages roughly 3.5-4 characters per token)."""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+@dataclass
+class AssembledContext:
+    """Packed context for the LLM prompt plus the per-sub-query view and savings report."""
+
+    text: str
+    contexts: List[dict]
+    report: Dict[str, int] = field(default_factory=dict)
+
+
+class ContextAssembler:
+    """
+    Builds the prompt context from the passages retrieved for every sub-query.
+
+    Sub-queries often retrieve the same chunks. A passage is kept once, under
+    the sub-query that scored it highest: exact repeats are recognised by
+    `source_id`, near-duplicates (overlapping chunks, repeated boilerplate) by
+    the Jaccard similarity of their word shingles. The remaining passages are
+    packed into `token_budget` tokens: first the best passage of each sub-query,
+    so every question keeps some context, then the rest in score order. The
+    report compares the result with the naive concatenation, which the
+    generation, validation and any regeneration call would each have sent.
+
+    When sub-queries are answered separately, `assemble_parts` gives each one
+    its own context instead: duplicates are only dropped within a sub-query and
+    every sub-query is packed into `part_token_budget` tokens of its own.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 6000,
+        near_duplicate_threshold: float = 0.8,
+        shingle_size: int = 3,
+        chars_per_token: float = 4.0,
+        part_token_budget: int = 3000
+    ):
+        self.token_budget = token_budget
+        self.part_token_budget = part_token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_size = shingle_size
+        self.chars_per_token = chars_per_token
+
+    @classmethod
+    def from_env(cls) -> "ContextAssembler":
+        return cls(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000")),
+            near_duplicate_threshold=float(os.getenv("CONTEXT_NEAR_DUPLICATE_THRESHOLD", "0.8")),
+            part_token_budget=int(os.getenv("CONTEXT_PART_TOKEN_BUDGET", "3000")),
+        )
+
+    def _shingles(self, text: str) -> FrozenSet[int]:
+        words = _WORD_PATTERN.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return frozenset([hash(" ".join(words))])
+        return frozenset(hash(" ".join(words[i:i + self.shingle_size])) for i in range(len(words) - self.shingle_size + 1))
+
+    @staticmethod
+    def _jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+    @staticmethod
+    def format_context(contexts: List[dict], start: int = 0) -> str:
+        """
+        The prompt layout the agents expect: one question/context block per
+        sub-query, numbered from `start` + 1.
+        """
+        return "".join(
+            f"\nQuestion {idx+1}: {item['question']}\n\nContext {idx+1}:\n{item['context']}\n"
+            for idx, item in enumerate(contexts, start)
+        )
+
+    def _naive_context(self, item: dict) -> dict:
+        """`item` with every retrieved passage concatenated, as sent before assembly."""
+        if not item.get("passages"):
+            return item
+        return {**item, "context": "[" + "\n\n".join(passage["text"] for passage in item["passages"]) + "]"}
+
+    def _deduplicate(self, candidates: List[Tuple[int, int, dict]]) -> Tuple[List[Tuple[int, int, dict]], int, int, Dict[int, set]]:
+        """
+        Keeps the first copy of every passage in `candidates`, given best first as
+        (sub-query index, rank, passage).
+
+        Returns:
+            The kept candidates, the exact and near-duplicate counts, and for every
+            sub-query the sub-queries whose kept passages also answer it.
+        """
+        unique, kept_ids, kept_shingles = [], {}, []
+        shared_with: Dict[int, set] = {}
+        duplicates = near_duplicates = 0
+        for q_index, rank, passage in candidates:
+            source_id = passage.get("source_id")
+            if source_id is not None and source_id in kept_ids:
+                duplicates += 1
+                shared_with.setdefault(q_index, set()).add(kept_ids[source_id])
+                continue
+            shingles = self._shingles(passage["text"])
+            match = next(
+                (owner for owner, other in kept_shingles if self._jaccard(shingles, other) >= self.near_duplicate_threshold),
+                None
+            )
+            if match is not None:
+                near_duplicates += 1
+                shared_with.setdefault(q_index, set()).add(match)
+                continue
+            kept_ids[source_id] = q_index
+            kept_shingles.append((q_index, shingles))
+            unique.append((q_index, rank, passage))
+        return unique, duplicates, near_duplicates, shared_with
+
+    def assemble(self, query_contexts: List[dict]) -> AssembledContext:
+        """
+        Deduplicates and packs the passages of `query_contexts` (as returned by
+        `RetrievalOrchestrator.retrieve`). Items without passages are kept as is.
+
+        Returns:
+            AssembledContext with the prompt text, the sub-query contexts rewritten
+            to the packed passages, and token counts before and after.
+        """
+        with get_tracer().span("context_assembly", queries=len(query_contexts)) as span:
+            naive = [self._naive_context(item) for item in query_contexts]
+            tokens_before = estimate_tokens(self.format_context(naive), self.chars_per_token)
+
+            candidates = []
+            for q_index, item in enumerate(query_contexts):
+                for rank, passage in enumerate(item.get("passages") or []):
+                    candidates.append((q_index, rank, passage))
+            candidates.sort(key=lambda candidate: -candidate[2]["score"])
+
+            unique, duplicates, near_duplicates, shared_with = self._deduplicate(candidates)
+
+            # Best passage of every sub-query first, then the rest by score.
+            firsts, rest, covered = [], [], set()
+            for candidate in unique:
+                (rest if candidate[0] in covered else firsts).append(candidate)
+                covered.add(candidate[0])
+
+            overhead = estimate_tokens(
+                self.format_context([{**item, "context": "[]"} for item in query_contexts]), self.chars_per_token
+            )
+            used = overhead
+            packed: Dict[int, list] = {}
+            dropped = 0
+            for q_index, rank, passage in firsts + rest:
+                cost = estimate_tokens(passage["text"] + "\n\n", self.chars_per_token)
+                if used + cost > self.token_budget:
+                    dropped += 1
+                    continue
+                used += cost
+                packed.setdefault(q_index, []).append((rank, passage))
+
+            contexts = []
+            for q_index, item in enumerate(query_contexts):
+                if not item.get("passages"):
+                    contexts.append(item)
+                    continue
+                passages = [passage for _, passage in sorted(packed.get(q_index, []), key=lambda entry: entry[0])]
+                context_str = "\n\n".join(passage["text"] for passage in passages)
+                if not passages:
+                    others = sorted(other + 1 for other in shared_with.get(q_index, ()) if other != q_index)
+                    context_str = f"See Context {', '.join(map(str, others))}" if others else ""
+                contexts.append(self._with_passages(item, passages, context_str))
+
+            text = self.format_context(contexts)
+            tokens_after = estimate_tokens(text, self.chars_per_token)
+            report = {
+                "tokens_before": tokens_before,
+                "tokens_after": tokens_after,
+                "tokens_saved": max(0, tokens_before - tokens_after),
+                "duplicates": duplicates,
+                "near_duplicates": near_duplicates,
+                "dropped_for_budget": dropped,
+            }
+            span.set(**report)
+        return AssembledContext(text=text, contexts=contexts, report=report)
+
+    @staticmethod
+    def _with_passages(item: dict, passages: List[dict], context_str: str) -> dict:
+        rerank_scores = [f"{passage['score']:.4f}" for passage in passages] if item.get("rerank_scores") else item.get("rerank_scores")
+        return {**item, "context": f"[{context_str}]", "rerank_scores": rerank_scores, "passages": passages}
+
+    def assemble_parts(self, query_contexts: List[dict]) -> AssembledContext:
+        """
+        Builds a self-contained context for every sub-query of `query_contexts`,
+        for answering them in separate calls: a sub-query keeps all of its own
+        passages except repeats among them, packed in score order into
+        `part_token_budget` tokens. Items without passages are kept as is.
+
+        Returns:
+            AssembledContext with the sub-query contexts and token counts summed
+            over the per-part prompts; `text` holds those prompts concatenated.
+        """
+        with get_tracer().span("context_assembly", queries=len(query_contexts), per_part=True) as span:
+            contexts = []
+            tokens_before = tokens_after = duplicates = near_duplicates = dropped = 0
+            for q_index, item in enumerate(query_contexts):
+                tokens_before += estimate_tokens(self.format_context([self._naive_context(item)], q_index), self.chars_per_token)
+                if not item.get("passages"):
+                    contexts.append(item)
+                    tokens_after += estimate_tokens(self.format_context([item], q_index), self.chars_per_token)
+                    continue
+
+                candidates = sorted(
+                    ((q_index, rank, passage) for rank, passage in enumerate(item["passages"])),
+                    key=lambda candidate: -candidate[2]["score"]
+                )
+                unique, part_duplicates, part_near_duplicates, _ = self._deduplicate(candidates)
+                duplicates += part_duplicates
+                near_duplicates += part_near_duplicates
+
+                used = estimate_tokens(self.format_context([{**item, "context": "[]"}], q_index), self.chars_per_token)
+                packed = []
+                for _, rank, passage in unique:
+                    cost = estimate_tokens(passage["text"] + "\n\n", self.chars_per_token)
+                    if used + cost > self.part_token_budget:
+                        dropped += 1
+                        continue
+                    used += cost
+                    packed.append((rank, passage))
+                passages = [passage for _, passage in sorted(packed, key=lambda entry: entry[0])]
+                part = self._with_passages(item, passages, "\n\n".join(passage["text"] for passage in passages))
+                contexts.append(part)
+                tokens_after += estimate_tokens(self.format_context([part], q_index), self.chars_per_token)
+
+            report = {
+                "tokens_before": tokens_before,
+                "tokens_after": tokens_after,
+                "tokens_saved": max(0, tokens_before - tokens_after),
+                "duplicates": duplicates,
+                "near_duplicates": near_duplicates,
+                "dropped_for_budget": dropped,
+                "parts": len(contexts),
+            }
+            span.set(**report)
+        return AssembledContext(text=self.format_context(contexts), contexts=contexts, report=report)
@@ -0,0 +1,242 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from src.services.tracing import get_tracer, propagate
+
+DRIVE_SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
+DRIVE_MANIFEST_FILE = ".drive_manifest.json"
+PDF_MIME_TYPE = "application/pdf"
+
+_UNSAFE_NAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+@dataclass(frozen=True)
+class DriveFile:
+    id: str
+    name: str
+    md5: Optional[str]
+    modified_time: str
+    size: Optional[int] = None
+
+    @property
+    def fingerprint(self) -> str:
+        # Drive only reports md5Checksum for binary content; fall back to the modification time.
+        return self.md5 or self.modified_time
+
+
+@dataclass
+class DriveSyncReport:
+    folder_path: str
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
+
+
+class DriveSync:
+    """
+    Mirrors the PDFs of a Google Drive folder into a local cache directory.
+
+    Each sync lists the folder (id, name, md5Checksum, modifiedTime) and
+    downloads only files that are new or whose checksum changed, up to
+    `max_workers` at a time; files deleted on Drive are deleted from the cache.
+    A manifest in the cache directory remembers what was downloaded, so
+    re-syncing an unchanged folder costs one listing call. The cached folder is
+    then ingested through the local PDF path (`DocumentLoader.iter_from_local`,
+    `VectorStorageManager.sync_folder`).
+
+    `service_factory` returns a Drive v3 service object and defaults to one
+    built from the credentials; it is called once per worker thread because
+    googleapiclient services are not thread-safe. Passing a factory for a fake
+    service exercises the sync without network access.
+    """
+
+    def __init__(
+        self,
+        credentials_path: str = "secret/credentials.json",
+        token_path: str = "secret/token.json",
+        cache_dir: str = "drive_cache",
+        max_workers: int = 8,
+        service_factory: Optional[Callable[[], Any]] = None
+    ):
+        self.credentials_path = credentials_path
+        self.token_path = token_path
+        self.cache_dir = cache_dir
+        self.max_workers = max(1, max_workers)
+        self._service_factory = service_factory or self._build_service
+        self._credentials = None
+        self._credentials_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _load_credentials(self):
+        with self._credentials_lock:
+            if self._credentials is not None:
+                return self._credentials
+
+            from google.auth.transport.requests import Request
+            from google.oauth2.credentials import Credentials
+
+            creds = None
+            if os.path.exists(self.token_path):
+                creds = Credentials.from_authorized_user_file(self.token_path, DRIVE_SCOPES)
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            if not creds or not creds.valid:
+                with open(self.credentials_path, "r", encoding="utf-8") as f:
+                    key_type = json.load(f).get("type")
+                if key_type == "service_account":
+                    from google.oauth2 import service_account
+
+                    creds = service_account.Credentials.from_service_account_file(self.credentials_path, scopes=DRIVE_SCOPES)
+                else:
+                    from google_auth_oauthlib.flow import InstalledAppFlow
+
+                    creds = InstalledAppFlow.from_client_secrets_file(self.credentials_path, DRIVE_SCOPES).run_local_server(port=0)
+                    with open(self.token_path, "w", encoding="utf-8") as f:
+                        f.write(creds.to_json())
+            self._credentials = creds
+            return creds
+
+    def _build_service(self):
+        from googleapiclient.discovery import build
+
+        return build("drive", "v3", credentials=self._load_credentials(), cache_discovery=False)
+
+    def _service(self):
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = self._local.service = self._service_factory()
+        return service
+
+    def list_files(self, folder_id: str) -> List[DriveFile]:
+        """Lists the PDFs directly inside `folder_id`, following pagination."""
+        files = []
+        page_token = None
+        while True:
+            response = self._service().files().list(
+                q=f"'{folder_id}' in parents and mimeType='{PDF_MIME_TYPE}' and trashed=false",
+                fields="nextPageToken, files(id, name, md5Checksum, modifiedTime, size)",
+                pageSize=1000,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True
+            ).execute()
+            for item in response.get("files", []):
+                files.append(DriveFile(
+                    id=item["id"],
+                    name=item["name"],
+                    md5=item.get("md5Checksum"),
+                    modified_time=item.get("modifiedTime", ""),
+                    size=int(item["size"]) if item.get("size") else None
+                ))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return files
+
+    @staticmethod
+    def _local_names(files: List[DriveFile]) -> Dict[str, str]:
+        """
+        Maps file ids to cache file names. Drive allows duplicate names in a
+        folder; duplicates get the file id appended so they do not overwrite each other.
+        """
+        safe_names = {}
+        for drive_file in files:
+            name = _UNSAFE_NAME.sub("_", drive_file.name)
+            safe_names[drive_file.id] = name if name.lower().endswith(".pdf") else f"{name}.pdf"
+        counts = Counter(name.lower() for name in safe_names.values())
+
+        names = {}
+        for file_id, name in safe_names.items():
+            if counts[name.lower()] > 1:
+                stem, ext = os.path.splitext(name)
+                name = f"{stem}_{file_id}{ext}"
+            names[file_id] = name
+        return names
+
+    def _download(self, drive_file: DriveFile, path: str) -> None:
+        content = self._service().files().get_media(fileId=drive_file.id, supportsAllDrives=True).execute()
+        tmp_path = f"{path}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def folder_path(self, folder_id: str) -> str:
+        return os.path.join(self.cache_dir, _UNSAFE_NAME.sub("_", folder_id))
+
+    def sync(self, folder_id: str) -> DriveSyncReport:
+        """
+        Brings the cache folder of `folder_id` in line with Drive.
+
+        Returns:
+            DriveSyncReport with the local folder path and the added, updated,
+            removed and unchanged file names.
+        """
+        tracer = get_tracer()
+        folder_path = self.folder_path(folder_id)
+        os.makedirs(folder_path, exist_ok=True)
+        manifest_path = os.path.join(folder_path, DRIVE_MANIFEST_FILE)
+        known: Dict[str, dict] = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                known = json.load(f).get("files", {})
+
+        report = DriveSyncReport(folder_path=folder_path)
+        with tracer.span("drive_sync", folder=folder_id) as span:
+            with tracer.span("drive_list") as list_span:
+                files = self.list_files(folder_id)
+                list_span.set(files=len(files))
+            names = self._local_names(files)
+
+            to_download = []
+            for drive_file in files:
+                entry = known.get(drive_file.id)
+                name = names[drive_file.id]
+                cached = os.path.exists(os.path.join(folder_path, name))
+                if entry and entry["fingerprint"] == drive_file.fingerprint and entry["name"] == name and cached:
+                    report.unchanged.append(name)
+                    continue
+                to_download.append(drive_file)
+                (report.updated if entry else report.added).append(name)
+
+            current_names = set(names.values())
+            for file_id, entry in known.items():
+                if file_id not in names:
+                    report.removed.append(entry["name"])
+                # Deleted or renamed on Drive: drop the old cache file.
+                path = os.path.join(folder_path, entry["name"])
+                if entry["name"] not in current_names and os.path.exists(path):
+                    os.remove(path)
+
+            if to_download:
+                print(f"Downloading {len(to_download)} changed files from Google Drive...")
+                with tracer.span("drive_download", files=len(to_download)):
+                    download = propagate(lambda drive_file: self._download(drive_file, os.path.join(folder_path, names[drive_file.id])))
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(to_download))) as executor:
+                        list(executor.map(download, to_download))
+
+            manifest = {
+                "folder_id": folder_id,
+                "files": {
+                    drive_file.id: {
+                        "name": names[drive_file.id],
+                        "fingerprint": drive_file.fingerprint,
+                        "modified_time": drive_file.modified_time,
+                    }
+                    for drive_file in files
+                },
+            }
+            with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+            span.set(added=len(report.added), updated=len(report.updated), removed=len(report.removed), unchanged=len(report.unchanged))
+        return report
@@ -0,0 +1,222 @@
+import hashlib
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+from src.services.embedding_providers import EmbeddingProviderInfo, configured_provider, create_provider, provider_info
+from src.services.tracing import add_to_current
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache backed by SQLite.
+
+    Vectors are keyed by (model, sha256(text)) and stored as float32 blobs.
+    The least recently used entries are evicted once `max_entries` is exceeded.
+    """
+
+    _LOOKUP_BATCH = 500
+
+    def __init__(self, db_path: str = "embedding_cache/embeddings.sqlite", max_entries: int = 500_000):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings (last_access)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Looks up a batch of texts and returns their vectors (None for misses).
+        """
+        hashes = [self._hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for start in range(0, len(unique_hashes), self._LOOKUP_BATCH):
+                batch = unique_hashes[start:start + self._LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+
+            results = [found.get(text_hash) for text_hash in hashes]
+            hit_count = sum(1 for vector in results if vector is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def set_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """
+        Stores a batch of vectors and evicts the least recently used entries if needed.
+        """
+        now = time.time()
+        rows = [
+            (model, self._hash(text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._entries += self._conn.total_changes - before
+
+            overflow = self._entries - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self._entries -= overflow
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": self._entries,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache and
+    sends only the misses to the underlying model, in a single batched call.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+
+    def _embed(self, namespace: str, texts: List[str], embed_fn) -> List[List[float]]:
+        vectors = self.cache.get_many(namespace, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        add_to_current(embedding_cache_hits=len(texts) - len(missing), embedding_cache_misses=len(missing))
+
+        if missing:
+            computed = dict(zip(missing, embed_fn(missing)))
+            self.cache.set_many(namespace, missing, [computed[text] for text in missing])
+            vectors = [
+                vector if vector is not None else computed[text]
+                for text, vector in zip(texts, vectors)
+            ]
+
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(f"{self.model_name}|document", list(texts), self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        # Query and document embeddings use different task types, so they are cached separately.
+        return self._embed(
+            f"{self.model_name}|query", [text],
+            lambda texts: [self.embeddings.embed_query(texts[0])]
+        )[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds several queries, sending all cache misses in one batched request
+        when the underlying model supports a query task type for batches.
+        """
+        def embed_missing(missing: List[str]) -> List[List[float]]:
+            if hasattr(self.embeddings, "embed_queries"):
+                return self.embeddings.embed_queries(missing)
+            if "task_type" in inspect.signature(self.embeddings.embed_documents).parameters:
+                return self.embeddings.embed_documents(missing, task_type="RETRIEVAL_QUERY")
+            return [self.embeddings.embed_query(text) for text in missing]
+
+        return self._embed(f"{self.model_name}|query", list(texts), embed_missing)
+
+    @property
+    def info(self) -> EmbeddingProviderInfo:
+        return provider_info(self.embeddings)
+
+
+_shared_embeddings: Dict[Tuple[str, str], Embeddings] = {}
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(
+                db_path=os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache/embeddings.sqlite"),
+                max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+            )
+        return _shared_cache
+
+
+def get_shared_embeddings(model_name: Optional[str] = None, provider: Optional[str] = None) -> Embeddings:
+    """
+    Returns the shared embeddings for the configured provider and model (see
+    `configured_provider`). Remote providers are wrapped in the persistent
+    embedding cache; local ones are returned as is.
+    """
+    info = configured_provider(provider, model_name)
+    key = (info.provider, info.model)
+    with _shared_lock:
+        shared = _shared_embeddings.get(key)
+    if shared is not None:
+        return shared
+
+    embeddings = create_provider(info.provider, info.model)
+    if embeddings.cacheable:
+        # Google vectors keep the model-name namespace used before providers existed.
+        namespace = info.model if info.provider == "google" else f"{info.provider}:{info.model}"
+        embeddings = CachedEmbeddings(embeddings, namespace, get_shared_cache())
+    with _shared_lock:
+        return _shared_embeddings.setdefault(key, embeddings)
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import math
+import os
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.services.tracing import add_to_current, propagate
+
+EMBEDDING_PROVIDER_FILE = "embedding_provider.json"
+
+
+@dataclass(frozen=True)
+class EmbeddingProviderInfo:
+    """Identifies the embedding space a vector store was built in."""
+
+    provider: str
+    model: str
+    dimensions: Optional[int] = None
+    normalized: bool = False
+
+    def same_space(self, other: "EmbeddingProviderInfo") -> bool:
+        if self.dimensions and other.dimensions and self.dimensions != other.dimensions:
+            return False
+        return self.provider == other.provider and self.model == other.model
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class EmbeddingProvider(Embeddings, ABC):
+    """
+    Base class of the embedding backends.
+
+    Subclasses implement `_embed_batch(texts, task)` for one batch, with `task`
+    either "document" or "query". This class splits larger inputs into
+    `batch_size` batches, runs up to `max_concurrency` of them at once and keeps
+    the input order.
+    """
+
+    name = "base"
+    # Whether results are worth keeping in the persistent EmbeddingCache.
+    cacheable = True
+    # Whether the backend produces vectors of a requested `dimensions`; otherwise it is learned from the first result.
+    configurable_dimensions = False
+
+    def __init__(self, model: str, batch_size: int = 100, max_concurrency: int = 4, dimensions: Optional[int] = None):
+        self.model = model
+        self.model_name = model
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.dimensions = dimensions
+        self.normalized = False
+
+    @abstractmethod
+    def _embed_batch(self, texts: List[str], task: str) -> List[List[float]]:
+        ...
+
+    def _embed(self, texts: List[str], task: str) -> List[List[float]]:
+        texts = list(texts)
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.max_concurrency == 1:
+            results = [self._embed_batch(batch, task) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+                results = list(executor.map(propagate(lambda batch: self._embed_batch(batch, task)), batches))
+        vectors = [vector for batch in results for vector in batch]
+        add_to_current(embedded_texts=len(texts), embedding_batches=len(batches))
+        if self.dimensions is None and vectors:
+            self.dimensions = len(vectors[0])
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "query")
+
+    @property
+    def info(self) -> EmbeddingProviderInfo:
+        return EmbeddingProviderInfo(self.name, self.model, self.dimensions, self.normalized)
+
+
+class GoogleEmbeddingProvider(EmbeddingProvider):
+    """Google Generative AI embeddings (network, quota-limited)."""
+
+    name = "google"
+
+    def __init__(self, model: str = "models/embedding-001", batch_size: int = 100, max_concurrency: int = 4):
+        super().__init__(model, batch_size=batch_size, max_concurrency=max_concurrency)
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.client = GoogleGenerativeAIEmbeddings(model=model)
+
+    def _embed_batch(self, texts: List[str], task: str) -> List[List[float]]:
+        if task == "query":
+            return self.client.embed_documents(texts, task_type="RETRIEVAL_QUERY")
+        return self.client.embed_documents(texts)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Local CPU embeddings with no model weights or network access.
+
+    Word unigrams and bigrams are hashed into `dimensions` signed buckets with
+    sublinear (1 + log tf) weighting, and the vectors are L2-normalized. Texts
+    sharing vocabulary land close together, which is enough for on-prem and
+    offline indexing; quality is below a trained model.
+    """
+
+    name = "hashing"
+    cacheable = False
+    configurable_dimensions = True
+
+    _TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, model: str = "hashing-v1", batch_size: int = 256, max_concurrency: int = 1, dimensions: Optional[int] = None):
+        super().__init__(model, batch_size=batch_size, max_concurrency=max_concurrency, dimensions=dimensions or 512)
+        self.normalized = True
+        self._features: Dict[str, Tuple[int, float]] = {}
+
+    def _feature(self, feature: str) -> Tuple[int, float]:
+        """Returns the (bucket, sign) of a feature; the low hash bit carries the sign."""
+        cached = self._features.get(feature)
+        if cached is None:
+            digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            cached = ((digest >> 1) % self.dimensions, 1.0 if digest & 1 else -1.0)
+            if len(self._features) < 1_000_000:
+                self._features[feature] = cached
+        return cached
+
+    def _embed_batch(self, texts: List[str], task: str) -> List[List[float]]:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = self._TOKEN_PATTERN.findall(text.lower())
+            features = Counter(tokens)
+            features.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+            for feature, tf in features.items():
+                bucket, sign = self._feature(feature)
+                matrix[row, bucket] += sign * (1.0 + math.log(tf))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (matrix / norms).tolist()
+
+
+PROVIDERS: Dict[str, Type[EmbeddingProvider]] = {
+    GoogleEmbeddingProvider.name: GoogleEmbeddingProvider,
+    HashingEmbeddingProvider.name: HashingEmbeddingProvider,
+}
+
+DEFAULT_MODELS = {
+    GoogleEmbeddingProvider.name: "models/embedding-001",
+    HashingEmbeddingProvider.name: "hashing-v1",
+}
+
+
+def configured_provider(provider: Optional[str] = None, model: Optional[str] = None) -> EmbeddingProviderInfo:
+    """
+    Resolves the provider and model to use: explicit arguments first, then env
+    EMBEDDING_PROVIDER (default "google") and, for the Google provider,
+    EMBEDDED_MODEL or EMBEDDING_MODEL.
+    """
+    provider = provider or os.getenv("EMBEDDING_PROVIDER", GoogleEmbeddingProvider.name)
+    if provider not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider '{provider}', expected one of {sorted(PROVIDERS)}")
+    if model is None and provider == GoogleEmbeddingProvider.name:
+        model = os.getenv("EMBEDDED_MODEL") or os.getenv("EMBEDDING_MODEL")
+    return EmbeddingProviderInfo(provider, model or DEFAULT_MODELS[provider])
+
+
+def create_provider(provider: Optional[str] = None, model: Optional[str] = None) -> EmbeddingProvider:
+    """
+    Builds the configured provider. Env EMBEDDING_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY
+    and EMBEDDING_DIMENSIONS override the backend defaults; EMBEDDING_DIMENSIONS only
+    applies to backends that honor it.
+    """
+    info = configured_provider(provider, model)
+    kwargs = {}
+    if os.getenv("EMBEDDING_BATCH_SIZE"):
+        kwargs["batch_size"] = int(os.getenv("EMBEDDING_BATCH_SIZE"))
+    if os.getenv("EMBEDDING_MAX_CONCURRENCY"):
+        kwargs["max_concurrency"] = int(os.getenv("EMBEDDING_MAX_CONCURRENCY"))
+    if os.getenv("EMBEDDING_DIMENSIONS") and PROVIDERS[info.provider].configurable_dimensions:
+        kwargs["dimensions"] = int(os.getenv("EMBEDDING_DIMENSIONS"))
+    return PROVIDERS[info.provider](model=info.model, **kwargs)
+
+
+def provider_info(embeddings: Embeddings) -> EmbeddingProviderInfo:
+    """Describes any embeddings object; models outside this module are recorded as "custom"."""
+    info = getattr(embeddings, "info", None)
+    if isinstance(info, EmbeddingProviderInfo):
+        return info
+    model = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None) or type(embeddings).__name__
+    return EmbeddingProviderInfo("custom", str(model))
+
+
+def save_provider_info(index_path: str, info: EmbeddingProviderInfo) -> None:
+    with open(os.path.join(index_path, EMBEDDING_PROVIDER_FILE), "w", encoding="utf-8") as f:
+        json.dump(info.to_dict(), f, indent=2)
+
+
+def load_provider_info(index_path: str) -> Optional[EmbeddingProviderInfo]:
+    """Returns the provider recorded for the store, or None for stores built before it was recorded."""
+    path = os.path.join(index_path, EMBEDDING_PROVIDER_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return EmbeddingProviderInfo(
+        data["provider"], data["model"], data.get("dimensions"), data.get("normalized", False)
+    )
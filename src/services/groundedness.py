@@ -0,0 +1,161 @@
+import os
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.services.lexical_index import tokenize
+from src.services.tracing import get_tracer
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_MARKDOWN_PREFIX = re.compile(r"^\s*(?:[-*>#]+\s*|\d+[.)]\s+|\*\*[^*]{0,40}\*\*:?\s*)+")
+
+GROUNDED = "grounded"
+BORDERLINE = "borderline"
+UNGROUNDED = "ungrounded"
+
+
+@dataclass
+class SentenceSupport:
+    sentence: str
+    score: float
+    lexical: float
+    semantic: Optional[float]
+    # Index of the best supporting passage.
+    evidence: int
+
+
+@dataclass
+class GroundednessResult:
+    verdict: str
+    score: float
+    sentences: List[SentenceSupport] = field(default_factory=list)
+    passages: List[str] = field(default_factory=list)
+    grounded_threshold: float = 0.0
+
+    @property
+    def unsupported(self) -> List[SentenceSupport]:
+        """Sentences below the grounded threshold, i.e. the ones worth a second opinion."""
+        return [item for item in self.sentences if item.score < self.grounded_threshold]
+
+    def evidence_context(self) -> str:
+        """The passages that best support the unsupported sentences, without repeats."""
+        indexes = []
+        for item in self.unsupported:
+            if item.evidence not in indexes:
+                indexes.append(item.evidence)
+        return "\n\n".join(f"[{self.passages[i]}]" for i in indexes)
+
+
+class GroundednessChecker:
+    """
+    Local pre-check of how well an answer is supported by the retrieved passages.
+
+    Every answer sentence gets a support score in [0, 1]: the share of its
+    content words found in the best matching passage, blended with the cosine
+    similarity of their embeddings when an embedding model is given and
+    `use_embeddings` is set (passages
+    were embedded at ingestion, so with the embedding cache only the answer
+    sentences cost an embedding call). Cosine similarities are rescaled so
+    `semantic_floor` maps to 0, since unrelated texts rarely score near zero.
+
+    An answer is "grounded" when every sentence reaches `grounded_threshold`,
+    "ungrounded" when at least half of its sentences have no meaningful support
+    (below `ungrounded_threshold`), and "borderline" otherwise, e.g. a single
+    weak sentence or a paraphrase. Only borderline answers need the LLM
+    validator, and only for their unsupported sentences.
+    """
+
+    def __init__(
+        self,
+        grounded_threshold: float = 0.6,
+        ungrounded_threshold: float = 0.15,
+        lexical_weight: float = 0.6,
+        semantic_floor: float = 0.5,
+        min_sentence_words: int = 4,
+        use_embeddings: bool = True
+    ):
+        self.grounded_threshold = grounded_threshold
+        self.ungrounded_threshold = ungrounded_threshold
+        self.lexical_weight = lexical_weight
+        self.semantic_floor = semantic_floor
+        self.min_sentence_words = min_sentence_words
+        self.use_embeddings = use_embeddings
+
+    @classmethod
+    def from_env(cls) -> "GroundednessChecker":
+        return cls(
+            grounded_threshold=float(os.getenv("GROUNDED_THRESHOLD", "0.6")),
+            ungrounded_threshold=float(os.getenv("UNGROUNDED_THRESHOLD", "0.15")),
+            use_embeddings=os.getenv("GROUNDEDNESS_USE_EMBEDDINGS", "1") == "1",
+        )
+
+    def split_sentences(self, answer: str) -> List[str]:
+        """Answer sentences worth checking; headings and short fragments are skipped."""
+        sentences = []
+        for raw in _SENTENCE_SPLIT.split(answer):
+            sentence = _MARKDOWN_PREFIX.sub("", raw).strip()
+            if len(tokenize(sentence)) >= self.min_sentence_words:
+                sentences.append(sentence)
+        return sentences
+
+    def _semantic(self, embed_model: Embeddings, sentences: List[str], passages: Sequence[str]) -> np.ndarray:
+        vectors = np.asarray(embed_model.embed_documents(list(sentences) + list(passages)), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+        similarities = vectors[:len(sentences)] @ vectors[len(sentences):].T
+        return np.clip((similarities - self.semantic_floor) / (1.0 - self.semantic_floor), 0.0, 1.0)
+
+    def check(self, answer: str, passages: Sequence[str], embed_model: Optional[Embeddings] = None) -> GroundednessResult:
+        """
+        Scores every sentence of `answer` against `passages`.
+
+        Returns:
+            GroundednessResult with the verdict, the lowest sentence score and the
+            per-sentence support.
+        """
+        with get_tracer().span("groundedness", passages=len(passages)) as span:
+            sentences = self.split_sentences(answer)
+            if not sentences or not passages:
+                # Only a non-empty answer made of short fragments has nothing to check;
+                # an empty generation is never accepted.
+                verdict = GROUNDED if not sentences and answer.strip() else UNGROUNDED
+                span.set(sentences=len(sentences), verdict=verdict)
+                return GroundednessResult(verdict, 1.0 if verdict == GROUNDED else 0.0, [], list(passages), self.grounded_threshold)
+
+            passage_terms = [set(tokenize(passage)) for passage in passages]
+            lexical = np.zeros((len(sentences), len(passages)), dtype=np.float32)
+            for i, sentence in enumerate(sentences):
+                terms = set(tokenize(sentence))
+                for j, available in enumerate(passage_terms):
+                    lexical[i, j] = len(terms & available) / max(1, len(terms))
+
+            use_semantic = self.use_embeddings and embed_model is not None
+            semantic = self._semantic(embed_model, sentences, passages) if use_semantic else None
+            combined = lexical if semantic is None else self.lexical_weight * lexical + (1 - self.lexical_weight) * semantic
+
+            support = []
+            for i, sentence in enumerate(sentences):
+                best = int(np.argmax(combined[i]))
+                support.append(SentenceSupport(
+                    sentence=sentence,
+                    score=float(combined[i, best]),
+                    lexical=float(lexical[i, best]),
+                    semantic=float(semantic[i, best]) if semantic is not None else None,
+                    evidence=best
+                ))
+
+            lowest = min(item.score for item in support)
+            weak = sum(1 for item in support if item.score < self.ungrounded_threshold)
+            if lowest >= self.grounded_threshold:
+                verdict = GROUNDED
+            elif weak * 2 >= len(support):
+                verdict = UNGROUNDED
+            else:
+                verdict = BORDERLINE
+            result = GroundednessResult(verdict, lowest, support, list(passages), self.grounded_threshold)
+            span.set(sentences=len(sentences), unsupported=len(result.unsupported), score=round(lowest, 3), verdict=verdict)
+            return result
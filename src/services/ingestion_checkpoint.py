@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.services.ingestion_pipeline import EmbeddedBatch
+
+CHECKPOINT_DIR = ".checkpoints"
+CHECKPOINT_STATE_FILE = "state.json"
+
+PageKey = Tuple[str, str]
+
+
+def page_key(doc: Document) -> PageKey:
+    """Identifies the source page a page or chunk Document came from."""
+    return str(doc.metadata.get("source", "unknown")), str(doc.metadata.get("page", "NA"))
+
+
+def run_key(*parts: object) -> str:
+    """Hashes whatever identifies an ingestion run's input (files, hashes, embedding provider)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def pages_key(pages: Sequence[Document]) -> str:
+    """Fingerprint of an in-memory page list: every page's source, number and text."""
+    digest = hashlib.sha256()
+    for page in pages:
+        digest.update(json.dumps(page_key(page)).encode("utf-8"))
+        digest.update(hashlib.sha256(page.page_content.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+class IngestionCheckpoint:
+    """
+    Embedded chunk batches of an unfinished ingestion run, kept under
+    `<index_path>/.checkpoints`.
+
+    Each batch is written as a vectors .npy file followed by a .json file with
+    the chunk texts, metadata and ids; the .json is renamed into place last, so
+    a batch only counts once both files are complete. Checkpoints are tied to a
+    run key describing the input: when the next run has a different key they
+    are discarded instead of resumed. `clear` removes them once the store has
+    been saved.
+    """
+
+    def __init__(self, index_path: str, key: str):
+        self.path = os.path.join(index_path, CHECKPOINT_DIR)
+        self.key = key
+        self._next_batch = 0
+        os.makedirs(self.path, exist_ok=True)
+
+        state_path = os.path.join(self.path, CHECKPOINT_STATE_FILE)
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        if state.get("key") != key:
+            if state:
+                print("Discarding ingestion checkpoints of a different input.")
+            self.clear()
+            os.makedirs(self.path, exist_ok=True)
+            with open(state_path, "w", encoding="utf-8") as f:
+                json.dump({"key": key}, f)
+        else:
+            names = self._batch_names()
+            self._next_batch = int(names[-1][len("batch_"):]) + 1 if names else 0
+
+    def _batch_names(self) -> List[str]:
+        return sorted(name[:-len(".json")] for name in os.listdir(self.path) if name.startswith("batch_") and name.endswith(".json"))
+
+    def _read_batch(self, name: str) -> dict:
+        with open(os.path.join(self.path, f"{name}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _load_rows(self, names: List[str], rows: Dict[int, List[int]]) -> Iterator[EmbeddedBatch]:
+        for b, name in enumerate(names):
+            if not rows.get(b):
+                continue
+            data = self._read_batch(name)
+            # Memory-mapped, so only the kept rows of this batch are read into memory.
+            vectors = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+            chunks = [Document(page_content=data["texts"][i], metadata=data["metadatas"][i]) for i in rows[b]]
+            yield EmbeddedBatch(chunks, [data["ids"][i] for i in rows[b]], np.asarray(vectors[rows[b]], dtype=np.float32))
+
+    def restore(self) -> Tuple[Iterator[EmbeddedBatch], Set[PageKey]]:
+        """
+        Finds the checkpointed chunks of pages that were completely embedded;
+        the rest of a half-done page is chunked again. Only the batch metadata is
+        read here: the returned iterator loads one batch's chunks and vectors at
+        a time, so resuming a large run does not hold the checkpointed corpus in
+        memory.
+
+        Returns:
+            An iterator over the restored batches and the keys of the pages they cover.
+        """
+        names = self._batch_names()
+        # A page cut off by a crash is chunked again, so its first chunks can be
+        # checkpointed twice; the latest copy of each chunk wins.
+        latest: Dict[Tuple[PageKey, int], Tuple[int, int]] = {}
+        totals: Dict[PageKey, int] = {}
+        for b, name in enumerate(names):
+            for i, metadata in enumerate(self._read_batch(name)["metadatas"]):
+                key = page_key(Document(page_content="", metadata=metadata))
+                latest[(key, int(metadata.get("chunk_index", i)))] = (b, i)
+                totals[key] = int(metadata.get("total_chunks", 1))
+        seen: Dict[PageKey, int] = defaultdict(int)
+        for key, _ in latest:
+            seen[key] += 1
+        complete = {key for key, count in seen.items() if count >= totals[key]}
+
+        rows: Dict[int, List[int]] = defaultdict(list)
+        for (key, _), (b, i) in latest.items():
+            if key in complete:
+                rows[b].append(i)
+        for batch_rows in rows.values():
+            batch_rows.sort()
+        restored_chunks = sum(len(batch_rows) for batch_rows in rows.values())
+        if restored_chunks:
+            print(f"Resuming ingestion from {restored_chunks} checkpointed chunks.")
+        return self._load_rows(names, rows), complete
+
+    def write(self, batch: EmbeddedBatch) -> None:
+        name = os.path.join(self.path, f"batch_{self._next_batch:06d}")
+        np.save(f"{name}.npy", np.asarray(batch.vectors, dtype=np.float32))
+        with open(f"{name}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": batch.ids,
+                "texts": [chunk.page_content for chunk in batch.chunks],
+                "metadatas": [chunk.metadata for chunk in batch.chunks],
+            }, f, separators=(",", ":"), default=str)
+        os.replace(f"{name}.json.tmp", f"{name}.json")
+        self._next_batch += 1
+
+    def clear(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def skip_pages(pages: Iterable[Document], done: Set[PageKey]) -> Iterator[Document]:
+    """Yields the pages not already covered by restored checkpoints."""
+    pages = iter(pages)
+    try:
+        for page in pages:
+            if page_key(page) not in done:
+                yield page
+    finally:
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
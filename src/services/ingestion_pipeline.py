@@ -0,0 +1,331 @@
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional
+from uuid import uuid4
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.services.ann_index import IndexSpec
+from src.services.tracing import Span, get_tracer, propagate
+
+if TYPE_CHECKING:
+    from src.services.chunking_process import SemanticChunkerWithNLP
+    from src.services.lexical_index import BM25Index
+    from src.services.term_index import MetadataTermIndex
+    from src.services.vector_storage_service import VectorStorageManager
+
+_END = object()
+
+
+class _Channel:
+    """
+    Bounded queue between two stages. Both ends give up waiting once the
+    pipeline is stopping, and the time spent blocked is kept for the trace.
+    """
+
+    def __init__(self, maxsize: int, stop: threading.Event):
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._stop = stop
+        self.put_wait = 0.0
+        self.get_wait = 0.0
+
+    def put(self, item: Any) -> bool:
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            self.put_wait += time.perf_counter() - start
+
+    def close(self) -> None:
+        self.put(_END)
+
+    def __iter__(self) -> Iterator[Any]:
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            finally:
+                self.get_wait += time.perf_counter() - start
+            if item is _END:
+                return
+            yield item
+
+
+@dataclass
+class EmbeddedBatch:
+    """Chunks of one indexing batch with their docstore ids and vectors."""
+
+    chunks: List[Document]
+    ids: List[str]
+    vectors: np.ndarray
+
+
+@dataclass
+class IngestionProgress:
+    """Running totals passed to `on_progress` after every indexed batch."""
+
+    pages_read: int
+    total_pages: Optional[int]
+    chunks_indexed: int
+    restored_chunks: int
+    elapsed: float
+
+    @property
+    def fraction(self) -> Optional[float]:
+        # Backpressure keeps reading at most a few batches ahead of indexing.
+        if not self.total_pages:
+            return None
+        return min(1.0, self.pages_read / self.total_pages)
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return (self.chunks_indexed - self.restored_chunks) / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass
+class IngestionResult:
+    vector_store: Any
+    ids_by_source: Dict[str, List[str]] = field(default_factory=dict)
+    pages: int = 0
+    chunks: int = 0
+    batches: int = 0
+    restored_chunks: int = 0
+
+
+class IngestionPipeline:
+    """
+    Streams pages into a FAISS store through overlapping stages.
+
+    read -> split -> enrich -> embed -> index each run in their own thread and
+    pass batches through bounded queues: PDF parsing, the sentence embeddings of
+    the semantic splitter, spaCy enrichment and chunk embedding run at the same
+    time, and a slow stage blocks the ones before it instead of letting batches
+    pile up, so memory is bounded by `queue_size` batches per stage rather than
+    by the corpus. Vectors are appended to the index one batch at a time; index
+    kinds that need training (IVF, SQ8) first collect
+    `IndexSpec.min_training_vectors()` vectors to train on.
+    """
+
+    def __init__(
+        self,
+        chunker: "SemanticChunkerWithNLP",
+        manager: "VectorStorageManager",
+        page_batch_size: int = 16,
+        embed_batch_size: int = 128,
+        queue_size: int = 2
+    ):
+        self.chunker = chunker
+        self.manager = manager
+        self.page_batch_size = max(1, page_batch_size)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.queue_size = max(1, queue_size)
+
+    @classmethod
+    def from_env(cls, chunker: "SemanticChunkerWithNLP", manager: "VectorStorageManager") -> "IngestionPipeline":
+        """Env INGEST_PAGE_BATCH_SIZE, INGEST_EMBED_BATCH_SIZE and INGEST_QUEUE_SIZE override the defaults."""
+        return cls(
+            chunker,
+            manager,
+            page_batch_size=int(os.getenv("INGEST_PAGE_BATCH_SIZE", "16")),
+            embed_batch_size=int(os.getenv("INGEST_EMBED_BATCH_SIZE", "128")),
+            queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "2")),
+        )
+
+    def run(
+        self,
+        pages: Iterable[Document],
+        vector_store=None,
+        spec: Optional[IndexSpec] = None,
+        lexical_index: Optional["BM25Index"] = None,
+        term_index: Optional["MetadataTermIndex"] = None,
+        on_batch: Optional[Callable[[EmbeddedBatch], None]] = None,
+        restored: Iterable[EmbeddedBatch] = (),
+        total_pages: Optional[int] = None,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None
+    ) -> IngestionResult:
+        """
+        Chunks, enriches, embeds and indexes `pages`, appending to `vector_store`
+        (a new store on `spec` when None). Batches in `restored` (e.g. from a
+        checkpoint) are indexed as well without being embedded again. The
+        lexical and term indexes are updated batch by batch; `on_batch` receives
+        every newly embedded batch before it is indexed and `on_progress` the
+        running totals after it is. Both run in the calling thread. Raises the
+        first error of any stage after stopping the others.
+
+        Returns:
+            IngestionResult with the resulting store and the new ids per source file.
+        """
+        spec = spec or self.manager.index_spec
+        embeddings = self.manager.embeddings_of(vector_store)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        page_batches, split_batches, enriched_batches, embedded_batches = (
+            _Channel(self.queue_size, stop) for _ in range(4)
+        )
+        result = IngestionResult(vector_store=vector_store)
+        tracer = get_tracer()
+        started = time.perf_counter()
+
+        def read(span: Span) -> None:
+            batch = []
+            try:
+                for page in pages:
+                    batch.append(page)
+                    result.pages += 1
+                    if len(batch) >= self.page_batch_size:
+                        if not page_batches.put(batch):
+                            return
+                        batch = []
+                if batch:
+                    page_batches.put(batch)
+            finally:
+                close = getattr(pages, "close", None)
+                if close is not None:
+                    close()
+                span.set(pages=result.pages, blocked_ms=round(page_batches.put_wait * 1000, 1))
+
+        def split(span: Span) -> None:
+            for batch in page_batches:
+                chunks = self.chunker.split_documents(batch)
+                span.add(chunks=len(chunks))
+                if chunks and not split_batches.put(chunks):
+                    return
+
+        def enrich(span: Span) -> None:
+            for chunks in split_batches:
+                if not enriched_batches.put(self.chunker.enrich(chunks)):
+                    return
+
+        def embed(span: Span) -> None:
+            pending: List[Document] = []
+
+            def flush() -> bool:
+                chunks = pending[:self.embed_batch_size]
+                del pending[:self.embed_batch_size]
+                vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+                span.add(chunks=len(chunks), batches=1)
+                return embedded_batches.put(EmbeddedBatch(chunks, [str(uuid4()) for _ in chunks], vectors))
+
+            for chunks in enriched_batches:
+                pending.extend(chunks)
+                while len(pending) >= self.embed_batch_size:
+                    if not flush():
+                        return
+            while pending:
+                if not flush():
+                    return
+
+        stages = [
+            ("ingest_read", read, page_batches),
+            ("ingest_split", split, split_batches),
+            ("ingest_enrich", enrich, enriched_batches),
+            ("ingest_embed", embed, embedded_batches),
+        ]
+
+        def run_stage(name: str, work: Callable[[Span], None], output: _Channel) -> None:
+            try:
+                with tracer.span(name) as span:
+                    work(span)
+                output.close()
+            except BaseException as e:
+                errors.append(e)
+                stop.set()
+
+        threads = [
+            threading.Thread(target=propagate(run_stage), args=stage, name=stage[0], daemon=True)
+            for stage in stages
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            with tracer.span("ingest_index", index_kind=spec.kind) as span:
+                training = spec.min_training_vectors() if vector_store is None else 0
+                buffered: List[EmbeddedBatch] = []
+
+                def index_buffered() -> None:
+                    self._index(result, buffered, spec, lexical_index, term_index)
+                    if on_progress is not None:
+                        on_progress(IngestionProgress(
+                            result.pages, total_pages, result.chunks, result.restored_chunks, time.perf_counter() - started
+                        ))
+                    buffered.clear()
+
+                def add(batch: EmbeddedBatch) -> None:
+                    buffered.append(batch)
+                    if sum(len(item.ids) for item in buffered) >= training:
+                        index_buffered()
+
+                # Restored batches are indexed as they are loaded, like new ones.
+                for batch in restored:
+                    result.restored_chunks += len(batch.ids)
+                    add(batch)
+                for batch in embedded_batches:
+                    if on_batch is not None:
+                        on_batch(batch)
+                    add(batch)
+                if buffered and not stop.is_set():
+                    index_buffered()
+                span.set(
+                    chunks=result.chunks,
+                    batches=result.batches,
+                    restored=result.restored_chunks,
+                    starved_ms=round(embedded_batches.get_wait * 1000, 1)
+                )
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+            raise
+        finally:
+            # Unblocks the other stages on failure; after a clean run they have already finished.
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+        return result
+
+    def _index(
+        self,
+        result: IngestionResult,
+        batches: List[EmbeddedBatch],
+        spec: IndexSpec,
+        lexical_index: Optional["BM25Index"],
+        term_index: Optional["MetadataTermIndex"]
+    ) -> None:
+        if len(batches) > 1:
+            batches = [EmbeddedBatch(
+                [chunk for batch in batches for chunk in batch.chunks],
+                [doc_id for batch in batches for doc_id in batch.ids],
+                np.concatenate([batch.vectors for batch in batches])
+            )]
+        batch = batches[0]
+        result.vector_store = self.manager.append_to_store(
+            result.vector_store,
+            [chunk.page_content for chunk in batch.chunks],
+            batch.vectors,
+            [chunk.metadata for chunk in batch.chunks],
+            batch.ids,
+            spec
+        )
+        if lexical_index is not None:
+            lexical_index.add_documents(batch.ids, batch.chunks)
+        if term_index is not None:
+            term_index.add_documents(batch.ids, batch.chunks)
+        for doc_id, chunk in zip(batch.ids, batch.chunks):
+            result.ids_by_source.setdefault(chunk.metadata.get("source", "unknown"), []).append(doc_id)
+        result.chunks += len(batch.ids)
+        result.batches += 1
@@ -0,0 +1,151 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+LEXICAL_INDEX_FILE = "lexical_index.json"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can did do does for from had has have how i if in into is it its "
+    "me my of on or our so than that the their them then there these they this those to was we were what "
+    "when where which who whom why will with would you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def iter_store_documents(vector_store) -> Iterable[Tuple[str, Document]]:
+    """Yields (docstore_id, Document) for every chunk in a langchain FAISS store."""
+    docstore = vector_store.docstore
+    if hasattr(docstore, "iter_documents"):
+        indexed = set(vector_store.index_to_docstore_id.values())
+        for doc_id, doc in docstore.iter_documents():
+            if doc_id in indexed:
+                yield doc_id, doc
+        return
+    for doc_id in vector_store.index_to_docstore_id.values():
+        doc = vector_store.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            yield doc_id, doc
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """Fuses ranked lists of keys with RRF: score = sum(1 / (k + rank))."""
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over chunk text and the NLP metadata extracted at
+    ingestion (entities, nouns, noun chunks). Metadata terms are counted
+    `metadata_weight` times so exact entity matches rank higher.
+    """
+
+    METADATA_FIELDS = ("entities", "nouns", "noun_chunks")
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, metadata_weight: int = 2):
+        self.k1 = k1
+        self.b = b
+        self.metadata_weight = metadata_weight
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+
+    def _document_terms(self, doc: Document) -> Counter:
+        terms = Counter(tokenize(doc.page_content))
+        for field in self.METADATA_FIELDS:
+            for value in doc.metadata.get(field, []) or []:
+                for term in tokenize(value):
+                    terms[term] += self.metadata_weight
+        return terms
+
+    def add_documents(self, ids: Sequence[str], docs: Sequence[Document]) -> None:
+        for doc_id, doc in zip(ids, docs):
+            if doc_id in self.doc_lengths:
+                self.remove_documents([doc_id])
+            terms = self._document_terms(doc)
+            for term, tf in terms.items():
+                self.postings[term][doc_id] = tf
+            length = sum(terms.values())
+            self.doc_lengths[doc_id] = length
+            self.total_length += length
+
+    def remove_documents(self, ids: Iterable[str]) -> None:
+        removed = {doc_id for doc_id in ids if doc_id in self.doc_lengths}
+        if not removed:
+            return
+        for term in list(self.postings):
+            postings = self.postings[term]
+            for doc_id in removed & postings.keys():
+                del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+        for doc_id in removed:
+            self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Returns the top-k (docstore_id, score) pairs for the query."""
+        n_docs = len(self.doc_lengths)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs or 1.0
+
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def save(self, index_path: str) -> None:
+        path = os.path.join(index_path, LEXICAL_INDEX_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "metadata_weight": self.metadata_weight,
+                "doc_lengths": self.doc_lengths,
+                "postings": self.postings,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional["BM25Index"]:
+        path = os.path.join(index_path, LEXICAL_INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"], metadata_weight=data["metadata_weight"])
+        index.doc_lengths = data["doc_lengths"]
+        index.postings = defaultdict(dict, data["postings"])
+        index.total_length = sum(index.doc_lengths.values())
+        return index
+
+    @classmethod
+    def build_from_store(cls, vector_store) -> "BM25Index":
+        index = cls()
+        ids, docs = [], []
+        for doc_id, doc in iter_store_documents(vector_store):
+            ids.append(doc_id)
+            docs.append(doc)
+        index.add_documents(ids, docs)
+        return index
@@ -1,9 +1,49 @@
+import multiprocessing
 import os
 import re
-import fitz  # PyMuPDF
-from typing import List, Optional, Union
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, Union
 from langchain_core.documents import Document
-from langchain_google_community import GoogleDriveLoader
+
+from src.services.tracing import get_tracer
+
+# Runs of citation markers and newlines, handled in one pass: citations are dropped,
+# a single newline becomes a space and two or more collapse into a paragraph break.
+_CLEAN_PATTERN = re.compile(r'(?:\[\d+\]|\n)+')
+
+
+def _clean_replacement(match: re.Match) -> str:
+    newlines = match.group(0).count('\n')
+    if newlines == 0:
+        return ''
+    return ' ' if newlines == 1 else '\n\n'
+
+
+def clean_text(text: str) -> str:
+    """Cleans extracted text with a single precompiled regex pass."""
+    return _CLEAN_PATTERN.sub(_clean_replacement, text).strip()
+
+
+def _extract_pages(pdf_path: str, start: int, stop: int) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    """
+    Extracts and cleans pages [start, stop) of a PDF. Runs inside worker processes.
+
+    Returns:
+        The (page_number, text) pairs of non-empty pages and an error message, if any.
+    """
+    import fitz  # PyMuPDF
+
+    pages = []
+    try:
+        with fitz.open(pdf_path) as doc:
+            for page_index in range(start, min(stop, doc.page_count)):
+                cleaned_text = clean_text(doc.load_page(page_index).get_text())
+                if cleaned_text:
+                    pages.append((page_index + 1, cleaned_text))
+        return pages, None
+    except Exception as e:
+        return pages, str(e)
 
 
 class DocumentLoader:
@@ -11,65 +51,120 @@ class DocumentLoader:
         self,
         credentials_path: str = "secret/credentials.json",
         token_path: str = "secret/token.json",
+        max_workers: Optional[int] = None,
+        pages_per_task: int = 32,
     ):
         self.credentials_path = credentials_path
         self.token_path = token_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
 
     def _clean_text(self, text: str) -> str:
         """Cleans extracted text using regular expressions."""
-        text = re.sub(r'\[\d+\]', '', text)
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r'(?<!\n)\n(?!\n)', ' ', text)
-        text = re.sub(r'\n{2,}', '\n\n', text)
-        return text.strip()
+        return clean_text(text)
 
     def load_from_drive(self, drive_folder_id: str) -> Union[List[Document], None]:
-        """Loads PDF documents from a specified Google Drive folder."""
+        """
+        Loads PDF documents from a Google Drive folder. Only new or changed files
+        are downloaded into the local Drive cache; pages are then extracted
+        through the local PDF path.
+        """
         if not drive_folder_id:
             print("Google Drive folder ID is not provided.")
             return None
 
-        loader = GoogleDriveLoader(
-            folder_id=drive_folder_id,
-            recursive=False,
-            file_types=["pdf"],
-            credentials_path=self.credentials_path,
-            token_path=self.token_path,
-            scopes=["https://www.googleapis.com/auth/drive.readonly"]
-        )
+        from src.services.drive_sync import DriveSync
 
         try:
-            documents: List[Document] = loader.load()
-            return documents
+            report = DriveSync(credentials_path=self.credentials_path, token_path=self.token_path).sync(drive_folder_id)
+            return self.load_from_local(report.folder_path)
         except Exception as e:
             print(f"Error loading from Drive: {e}")
             return None
 
-    def load_from_local(self, folder_path: str) -> List[Document]:
-        """Loads and cleans text from all PDF files in the specified local folder."""
+    def count_pages(self, folder_path: str, filenames: List[str]) -> int:
+        """Total page count of the given PDFs, read from their page trees only."""
+        import fitz  # PyMuPDF
+
+        total = 0
+        for filename in filenames:
+            try:
+                with fitz.open(os.path.join(folder_path, filename)) as doc:
+                    total += doc.page_count
+            except Exception:
+                continue
+        return total
+
+    def _page_tasks(self, folder_path: str, filenames: List[str]) -> Iterator[Tuple[str, str, int, int]]:
+        """Splits every PDF into page ranges so large files are spread across workers."""
+        import fitz  # PyMuPDF
+
+        for filename in filenames:
+            pdf_path = os.path.join(folder_path, filename)
+            try:
+                with fitz.open(pdf_path) as doc:
+                    page_count = doc.page_count
+            except Exception as e:
+                print(f"Failed to process {filename}: {e}")
+                continue
+            for start in range(0, page_count, self.pages_per_task):
+                yield filename, pdf_path, start, start + self.pages_per_task
+
+    def iter_from_local(
+        self,
+        folder_path: str,
+        filenames: Optional[List[str]] = None,
+        max_workers: Optional[int] = None
+    ) -> Iterator[Document]:
+        """
+        Yields cleaned PDF pages from a local folder as they are extracted.
+
+        Page ranges are extracted in a process pool of `max_workers` processes
+        (defaults to the loader's setting); a value of 1 extracts in-process.
+        Pages are yielded in file and page order, and at most two tasks per worker
+        are in flight so memory stays bounded on large folders.
+        """
         if not folder_path or not os.path.isdir(folder_path):
             print(f"Invalid folder path: {folder_path}")
-            return []
-
-        cleaned_docs = []
-
-        for filename in os.listdir(folder_path):
-            if filename.lower().endswith('.pdf'):
-                pdf_path = os.path.join(folder_path, filename)
-                try:
-                    with fitz.open(pdf_path) as doc:
-                        for page_num, page in enumerate(doc, start=1):
-                            raw_text = page.get_text()
-                            cleaned_text = self._clean_text(raw_text)
-                            if cleaned_text:
-                                cleaned_docs.append(Document(
-                                    page_content=cleaned_text,
-                                    metadata={
-                                        "source": filename,
-                                        "page": page_num
-                                    }
-                                ))
-                except Exception as e:
-                    print(f"Failed to process {filename}: {e}")
-
-        return cleaned_docs
+            return
+
+        pdf_files = sorted(
+            filename for filename in os.listdir(folder_path)
+            if filename.lower().endswith('.pdf') and (filenames is None or filename in filenames)
+        )
+        tasks = self._page_tasks(folder_path, pdf_files)
+        workers = max_workers or self.max_workers
+
+        def to_documents(filename: str, result: Tuple[List[Tuple[int, str]], Optional[str]]) -> Iterator[Document]:
+            pages, error = result
+            if error:
+                print(f"Failed to process {filename}: {error}")
+            for page_num, text in pages:
+                yield Document(page_content=text, metadata={"source": filename, "page": page_num})
+
+        if workers <= 1:
+            for filename, pdf_path, start, stop in tasks:
+                yield from to_documents(filename, _extract_pages(pdf_path, start, stop))
+            return
+
+        # Spawned, not forked: the app process already runs threads, and forking those can deadlock.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pending = deque()
+            for filename, pdf_path, start, stop in tasks:
+                pending.append((filename, executor.submit(_extract_pages, pdf_path, start, stop)))
+                if len(pending) >= workers * 2:
+                    filename, future = pending.popleft()
+                    yield from to_documents(filename, future.result())
+            while pending:
+                filename, future = pending.popleft()
+                yield from to_documents(filename, future.result())
+
+    def load_from_local(self, folder_path: str, filenames: Optional[List[str]] = None) -> List[Document]:
+        """
+        Loads and cleans text from all PDF files in the specified local folder,
+        or only from `filenames` when given.
+        """
+        with get_tracer().span("load_pdfs", files=len(filenames) if filenames is not None else None) as span:
+            pages = list(self.iter_from_local(folder_path, filenames=filenames))
+            span.set(pages=len(pages))
+            return pages
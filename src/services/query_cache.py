@@ -0,0 +1,122 @@
+import copy
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class QueryResultCache:
+    """
+    Two-level cache of answered questions, tied to one vector store version.
+
+    Level 1 matches the normalized query text exactly. Level 2 embeds the query and
+    returns the most similar cached question if its cosine similarity reaches
+    `similarity_threshold`. Both levels only match entries stored under the same
+    retrieval settings fingerprint (see `settings_key`), so changing reranking or
+    hybrid retrieval does not return answers retrieved the old way. Entries hold
+    whatever the caller stores (transformed queries, contexts, validated answer)
+    and are dropped whenever the store version the cache is bound to changes.
+    """
+
+    def __init__(self, embed_model: Optional[Embeddings] = None, similarity_threshold: float = 0.95, max_entries: int = 256):
+        self.embed_model = embed_model
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.store_version: Optional[str] = None
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, embed_model: Optional[Embeddings] = None) -> "QueryResultCache":
+        return cls(
+            embed_model=embed_model,
+            similarity_threshold=float(os.getenv("QUERY_CACHE_SIMILARITY", "0.95")),
+            max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256")),
+        )
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", query).strip().lower().rstrip("?.! ")
+
+    @staticmethod
+    def settings_key(**settings) -> str:
+        """Fingerprint of the retrieval settings an answer was produced with."""
+        return json.dumps(settings, sort_keys=True, default=str)
+
+    def _bind(self, store_version: str) -> None:
+        if store_version != self.store_version:
+            self._entries.clear()
+            self._vectors.clear()
+            self.store_version = store_version
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        if self.embed_model is None:
+            return None
+        vector = np.asarray(self.embed_model.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, query: str, store_version: str, settings: str = "") -> Optional[dict]:
+        """
+        Returns a copy of the cached result for `query` against `store_version` under
+        `settings`, or None. The copy carries a "cache_level" key set to "exact" or "semantic".
+        """
+        key = (settings, self.normalize(query))
+        with self._lock:
+            self._bind(store_version)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return {**copy.deepcopy(self._entries[key]), "cache_level": "exact"}
+            keys = [cached for cached in self._vectors if cached[0] == settings]
+            if not keys:
+                self.misses += 1
+                return None
+            matrix = np.stack([self._vectors[cached] for cached in keys])
+
+        query_vector = self._embed(query)
+        if query_vector is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        similarities = matrix @ query_vector
+        best = int(np.argmax(similarities))
+        with self._lock:
+            if similarities[best] >= self.similarity_threshold and keys[best] in self._entries:
+                self._entries.move_to_end(keys[best])
+                self.hits_semantic += 1
+                return {**copy.deepcopy(self._entries[keys[best]]), "cache_level": "semantic"}
+            self.misses += 1
+            return None
+
+    def put(self, query: str, store_version: str, result: dict, settings: str = "") -> None:
+        key = (settings, self.normalize(query))
+        vector = self._embed(query)
+        with self._lock:
+            self._bind(store_version)
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            if vector is not None:
+                self._vectors[key] = vector
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._vectors.pop(evicted, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+            }
@@ -1,14 +1,30 @@
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from sklearn.metrics.pairwise import cosine_similarity
-import spacy
-from typing import List, Tuple, Set
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.services.chunking_process import load_trimmed_pipeline
+from src.services.embedding_cache import get_shared_embeddings
+from src.services.term_index import MetadataTermIndex
+from src.services.tracing import get_tracer
+
+# Only entities and nouns of the question are used for boosts.
+QUESTION_FEATURES = ("entities", "nouns")
 
 
 class RerankingProcess:
-    def __init__(self):
-        self.embed_model = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        self.nlp = spacy.load("en_core_web_sm")
+    def __init__(self, embed_model: Embeddings = None, question_cache_size: int = 1024):
+        self.embed_model = embed_model or get_shared_embeddings()
+        self.nlp = load_trimmed_pipeline("en_core_web_sm", QUESTION_FEATURES)
+        self.term_index = MetadataTermIndex()
+        self.question_cache_size = question_cache_size
+        self._question_terms: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()
+        self._position_maps = weakref.WeakKeyDictionary()
+        self._nlp_lock = threading.Lock()
 
     def _normalize_tokens(self, tokens: List[str]) -> List[str]:
         return list(set(
@@ -16,48 +32,123 @@ class RerankingProcess:
         ))
 
     def extract_nlp_features(self, text: str) -> dict:
-        doc = self.nlp(text)
+        """Extracts the question features used for boosts (entities and nouns)."""
+        # spaCy pipelines are not guaranteed to be thread-safe; rerank may run from a thread pool.
+        with self._nlp_lock:
+            doc = self.nlp(text)
         return {
             "entities": self._normalize_tokens([ent.text for ent in doc.ents]),
-            "entity_labels": list(set(ent.label_ for ent in doc.ents)),
             "nouns": self._normalize_tokens([t.text for t in doc if t.pos_ == "NOUN" and not t.is_stop]),
-            "verbs": self._normalize_tokens([t.text for t in doc if t.pos_ == "VERB" and not t.is_stop]),
-            "adjectives": self._normalize_tokens([t.text for t in doc if t.pos_ == "ADJ"]),
-            "noun_chunks": self._normalize_tokens([chunk.text for chunk in doc.noun_chunks]),
-            "sentences": [sent.text.strip() for sent in doc.sents],
-            "word_count": len([t for t in doc if t.is_alpha])
         }
 
-    def _custom_score(self, sim: float, meta: dict, question_terms: Set[str]) -> float:
-        meta_nouns = set(word.lower() for word in meta.get('nouns', []))
-        meta_entities = set(ent.lower() for ent in meta.get('entities', []))
-        meta_chunks = set(chunk.lower() for chunk in meta.get('noun_chunks', []))
-
-        match_score = 0.0
-        for term in question_terms:
-            if term in meta_nouns:
-                match_score += 0.05
-            if term in meta_entities:
-                match_score += 0.1
-            if term in meta_chunks:
-                match_score += 0.07
-
-        return sim + match_score
-
-    def rerank(self, question: str, docs: List[Document]) -> List[Tuple[Document, float]]:
-        question_embedding = self.embed_model.embed_query(question)
-        doc_texts = [doc.page_content for doc in docs]
-        doc_embeddings = self.embed_model.embed_documents(doc_texts)
-        similarities = cosine_similarity([question_embedding], doc_embeddings)[0]
-
-        question_meta = self.extract_nlp_features(question)
-        question_terms = set(
-            question_meta.get("entities", []) + question_meta.get("nouns", [])
-        )
-
-        scored_docs = [
-            (doc, self._custom_score(similarities[i], doc.metadata, question_terms))
-            for i, doc in enumerate(docs)
-        ]
-
-        return sorted(scored_docs, key=lambda x: x[1], reverse=True)
+    def _question_term_set(self, question: str) -> FrozenSet[str]:
+        """Returns the question's entity and noun terms, memoized per question text."""
+        with self._nlp_lock:
+            if question in self._question_terms:
+                self._question_terms.move_to_end(question)
+                return self._question_terms[question]
+
+        features = self.extract_nlp_features(question)
+        terms = frozenset(features["entities"] + features["nouns"])
+
+        with self._nlp_lock:
+            self._question_terms[question] = terms
+            while len(self._question_terms) > self.question_cache_size:
+                self._question_terms.popitem(last=False)
+        return terms
+
+    def _custom_scores(
+        self,
+        similarities: np.ndarray,
+        docs: List[Document],
+        question_terms: FrozenSet[str],
+        term_index: Optional[MetadataTermIndex] = None
+    ) -> np.ndarray:
+        """
+        Adds metadata boosts (0.05 per matching noun, 0.1 per entity, 0.07 per noun
+        chunk) to the similarities of all candidates in one vectorized pass.
+        """
+        return similarities + (term_index or self.term_index).match_boosts(docs, question_terms)
+
+    def _docstore_positions(self, vector_store) -> Dict[str, int]:
+        """Returns a cached docstore id -> FAISS position map for the given store."""
+        mapping = vector_store.index_to_docstore_id
+        key = (id(mapping), len(mapping))
+        cached = self._position_maps.get(vector_store)
+        if cached is None or cached[0] != key:
+            cached = (key, {doc_id: pos for pos, doc_id in mapping.items()})
+            self._position_maps[vector_store] = cached
+        return cached[1]
+
+    def _stored_vectors(self, vector_store, docs: List[Document]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Fetches the vectors already stored in the FAISS index for the given docs.
+
+        Returns:
+            The (n_docs, dim) matrix and the indices of docs whose vectors were
+            not found (their rows are left as zeros).
+        """
+        positions = self._docstore_positions(vector_store)
+        found = [(i, positions.get(doc.id)) for i, doc in enumerate(docs) if doc.id is not None]
+        found = [(i, pos) for i, pos in found if pos is not None]
+
+        vectors = np.zeros((len(docs), vector_store.index.d), dtype=np.float32)
+        if found:
+            rows, ids = zip(*found)
+            try:
+                vectors[list(rows)] = vector_store.index.reconstruct_batch(np.asarray(ids, dtype=np.int64))
+            except RuntimeError as e:
+                print(f"[WARN] Stored vectors unavailable for reranking: {e}")
+                found = []
+
+        found_rows = {i for i, _ in found}
+        return vectors, [i for i in range(len(docs)) if i not in found_rows]
+
+    @staticmethod
+    def _cosine_similarities(query: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+        query_norm = np.linalg.norm(query) or 1.0
+        doc_norms = np.linalg.norm(matrix, axis=1)
+        doc_norms[doc_norms == 0] = 1.0
+        return (matrix @ query) / (doc_norms * query_norm)
+
+    def rerank(
+        self,
+        question: str,
+        docs: List[Document],
+        vector_store=None,
+        query_embedding: Optional[List[float]] = None,
+        term_index: Optional[MetadataTermIndex] = None
+    ) -> List[Tuple[Document, float]]:
+        """
+        Reranks retrieved docs by cosine similarity plus metadata term boosts.
+
+        When `vector_store` is given, the candidates' vectors are read back from its
+        FAISS index by docstore id instead of being embedded again; only docs that
+        cannot be found in the index are sent to the embedding model. `term_index` is
+        the store's precomputed MetadataTermIndex; candidates it does not cover have
+        their term sets encoded per call.
+        """
+        if not docs:
+            return []
+
+        with get_tracer().span("rerank", candidates=len(docs)) as span:
+            if query_embedding is None:
+                query_embedding = self.embed_model.embed_query(question)
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+
+            if vector_store is not None:
+                doc_vectors, missing = self._stored_vectors(vector_store, docs)
+            else:
+                doc_vectors, missing = np.zeros((len(docs), query_vector.shape[0]), dtype=np.float32), list(range(len(docs)))
+
+            span.set(stored_vectors=len(docs) - len(missing), embedded=len(missing))
+            if missing:
+                # Embed with the store's own model so the vectors share its embedding space.
+                embed_model = getattr(vector_store, "embedding_function", None) or self.embed_model
+                doc_vectors[missing] = embed_model.embed_documents([docs[i].page_content for i in missing])
+
+            similarities = self._cosine_similarities(query_vector, doc_vectors)
+            scores = self._custom_scores(similarities, docs, self._question_term_set(question), term_index)
+
+            order = np.argsort(-scores, kind="stable")
+            return [(docs[i], float(scores[i])) for i in order]
@@ -0,0 +1,178 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src.services.embedding_cache import get_shared_embeddings
+from src.services.lexical_index import BM25Index
+from src.services.query_cache import QueryResultCache
+from src.services.term_index import MetadataTermIndex
+
+
+@dataclass
+class LoadedStore:
+    """A loaded FAISS store with its side indexes, shared by every session using it."""
+
+    index_path: str
+    version: str
+    vector_store: Any
+    lexical_index: BM25Index
+    term_index: MetadataTermIndex
+    query_cache: QueryResultCache
+
+
+class ResourceRegistry:
+    """
+    Process-wide home for heavy resources (spaCy pipelines, embedding and Bedrock
+    clients, loaded vector stores).
+
+    Streamlit re-executes the app script on every interaction, but imported modules
+    stay loaded, so resources kept here are built once per process and shared by
+    all sessions. Each resource is created by its factory the first time it is
+    requested; concurrent first requests wait for the same construction instead of
+    building it twice. Loaded vector stores are kept in a bounded LRU keyed by
+    store path and reloaded when the files on disk change. While a writer holds
+    `store_lock` for a path, readers keep getting the cached copy without
+    waiting; the writer publishes its result with `put_vector_store`.
+    """
+
+    def __init__(self, max_vector_stores: int = 4):
+        self.max_vector_stores = max_vector_stores
+        self._resources: Dict[str, Any] = {}
+        self._resource_locks: Dict[str, threading.Lock] = {}
+        self._stores: "OrderedDict[str, LoadedStore]" = OrderedDict()
+        self._load_locks: Dict[str, threading.RLock] = {}
+        self._writer_locks: Dict[str, threading.RLock] = {}
+        self._writing: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.store_loads = 0
+        self.store_hits = 0
+
+    def get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """Returns the resource registered under `name`, building it with `factory` on first use."""
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            name_lock = self._resource_locks.setdefault(name, threading.Lock())
+        with name_lock:
+            if name not in self._resources:
+                self._resources[name] = factory()
+            return self._resources[name]
+
+    def _load_lock(self, key: str) -> threading.RLock:
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.RLock())
+
+    def _writer_lock(self, key: str) -> threading.RLock:
+        with self._lock:
+            return self._writer_locks.setdefault(key, threading.RLock())
+
+    def _remember(self, loaded: LoadedStore) -> LoadedStore:
+        with self._lock:
+            self._stores[loaded.index_path] = loaded
+            self._stores.move_to_end(loaded.index_path)
+            while len(self._stores) > self.max_vector_stores:
+                self._stores.popitem(last=False)
+        return loaded
+
+    def _wrap(self, index_path: str, manager, vector_store, query_cache: Optional[QueryResultCache] = None) -> LoadedStore:
+        # Side indexes are loaded first: building a missing one writes to the store directory.
+        lexical_index = manager.load_lexical_index(index_path, vector_store)
+        term_index = manager.load_term_index(index_path, vector_store)
+        return LoadedStore(
+            index_path=os.path.abspath(index_path),
+            version=manager.store_version(index_path),
+            vector_store=vector_store,
+            lexical_index=lexical_index,
+            term_index=term_index,
+            query_cache=query_cache or QueryResultCache.from_env(embed_model=get_shared_embeddings()),
+        )
+
+    def vector_store(self, index_path: str, manager) -> Optional[LoadedStore]:
+        """
+        Returns the loaded store at `index_path`, loading it with
+        `manager.exist_in_faiss` if it is not cached or its files changed on disk.
+        During a write the cached copy is returned as is; only a store that is
+        not cached yet waits for the writer to finish.
+
+        Returns:
+            LoadedStore, or None if the store could not be loaded.
+        """
+        key = os.path.abspath(index_path)
+        with self._lock:
+            loaded = self._stores.get(key)
+            if loaded is not None and key in self._writing:
+                self._stores.move_to_end(key)
+                self.store_hits += 1
+                return loaded
+        if loaded is None and key in self._writing:
+            # Nothing to serve meanwhile; the files on disk are being rewritten.
+            with self._writer_lock(key):
+                pass
+
+        with self._load_lock(key):
+            version = manager.store_version(index_path)
+            with self._lock:
+                loaded = self._stores.get(key)
+                if loaded is not None and loaded.version == version:
+                    self._stores.move_to_end(key)
+                    self.store_hits += 1
+                    return loaded
+
+            vector_store = manager.exist_in_faiss(index_path)
+            if not vector_store:
+                return None
+            self.store_loads += 1
+            return self._remember(self._wrap(index_path, manager, vector_store, loaded.query_cache if loaded else None))
+
+    def put_vector_store(self, index_path: str, manager, vector_store) -> LoadedStore:
+        """Registers a store the caller just built or synced, replacing any cached copy."""
+        key = os.path.abspath(index_path)
+        with self._load_lock(key):
+            with self._lock:
+                previous = self._stores.get(key)
+            return self._remember(self._wrap(index_path, manager, vector_store, previous.query_cache if previous else None))
+
+    @contextmanager
+    def store_lock(self, index_path: str) -> Iterator[None]:
+        """
+        Serializes writers (sync, rebuild) of the store at `index_path` across
+        sessions. Readers are not blocked: they keep the cached copy until the
+        writer calls `put_vector_store`.
+        """
+        key = os.path.abspath(index_path)
+        with self._writer_lock(key):
+            with self._lock:
+                self._writing[key] = self._writing.get(key, 0) + 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self._writing[key] -= 1
+                    if not self._writing[key]:
+                        del self._writing[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resources": sorted(self._resources),
+                "vector_stores": list(self._stores),
+                "store_hits": self.store_hits,
+                "store_loads": self.store_loads,
+            }
+
+
+_registry: Optional[ResourceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ResourceRegistry:
+    """Returns the process-wide registry; env VECTOR_STORE_CACHE_SIZE bounds the loaded store LRU."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ResourceRegistry(max_vector_stores=int(os.getenv("VECTOR_STORE_CACHE_SIZE", "4")))
+        return _registry
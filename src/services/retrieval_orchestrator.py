@@ -0,0 +1,175 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from src.services.lexical_index import BM25Index, reciprocal_rank_fusion
+from src.services.reranking_process import RerankingProcess
+from src.services.term_index import MetadataTermIndex
+from src.services.tracing import get_tracer, propagate
+
+
+class RetrievalOrchestrator:
+    """
+    Retrieves (and optionally reranks) context for all transformed sub-queries at once.
+
+    All sub-query texts are embedded in one batched call, then the MMR searches and
+    reranking run concurrently in a thread pool. Results keep the sub-query order.
+
+    When a BM25 index is passed, each sub-query also runs a lexical search and the
+    dense and lexical rankings are combined with reciprocal-rank fusion, keeping the
+    top `k` candidates.
+    """
+
+    def __init__(
+        self,
+        reranker: Optional[RerankingProcess] = None,
+        k: int = 10,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        max_workers: int = 4,
+        dense_k: Optional[int] = None,
+        lexical_k: int = 10,
+        rrf_k: int = 60
+    ):
+        self.reranker = reranker
+        self.k = k
+        self.dense_k = dense_k or k
+        self.lexical_k = lexical_k
+        self.rrf_k = rrf_k
+        self.fetch_k = fetch_k
+        self.lambda_mult = lambda_mult
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _embed_queries(vector_store, queries: List[str]) -> List[List[float]]:
+        embedder = vector_store.embedding_function
+        if hasattr(embedder, "embed_queries"):
+            return embedder.embed_queries(queries)
+        return [embedder.embed_query(query) for query in queries]
+
+    def _search(self, vector_store, query: str, embedding: List[float], lexical_index: Optional[BM25Index]) -> List[Document]:
+        tracer = get_tracer()
+        if lexical_index is None:
+            with tracer.span("dense_search", fetch_k=self.fetch_k) as span:
+                docs = vector_store.max_marginal_relevance_search_by_vector(
+                    embedding, k=self.k, fetch_k=self.fetch_k, lambda_mult=self.lambda_mult
+                )
+                span.set(candidates=len(docs))
+                return docs
+
+        with tracer.span("dense_search", fetch_k=max(self.fetch_k, self.dense_k)) as span:
+            dense_docs = vector_store.max_marginal_relevance_search_by_vector(
+                embedding, k=self.dense_k, fetch_k=max(self.fetch_k, self.dense_k), lambda_mult=self.lambda_mult
+            )
+            span.set(candidates=len(dense_docs))
+        with tracer.span("lexical_search") as span:
+            lexical_hits = lexical_index.search(query, k=self.lexical_k)
+            span.set(candidates=len(lexical_hits))
+
+        candidates = {self._doc_key(doc): doc for doc in dense_docs}
+        lexical_keys = []
+        for doc_id, _ in lexical_hits:
+            doc = vector_store.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                continue
+            if doc.id is None:
+                doc = Document(id=doc_id, page_content=doc.page_content, metadata=doc.metadata)
+            key = self._doc_key(doc)
+            candidates.setdefault(key, doc)
+            lexical_keys.append(key)
+
+        fused = reciprocal_rank_fusion([[self._doc_key(doc) for doc in dense_docs], lexical_keys], k=self.rrf_k)
+        return [candidates[key] for key, _ in fused[:self.k]]
+
+    @staticmethod
+    def _passage(doc: Document, score: float) -> dict:
+        return {
+            "source_id": doc.metadata.get("source_id") or doc.id,
+            "source": doc.metadata.get("source"),
+            "page": doc.metadata.get("page"),
+            "text": doc.page_content,
+            "score": float(score),
+        }
+
+    @staticmethod
+    def _doc_key(doc: Document):
+        return doc.id or doc.metadata.get("source_id") or doc.page_content
+
+    def _retrieve_one(
+        self,
+        vector_store,
+        query: str,
+        embedding: List[float],
+        use_reranking: bool,
+        rerank_top_k: int,
+        lexical_index: Optional[BM25Index],
+        term_index: Optional[MetadataTermIndex]
+    ) -> dict:
+        with get_tracer().span("retrieve_query"):
+            top_docs = self._search(vector_store, query, embedding, lexical_index)
+
+            if use_reranking and self.reranker is not None:
+                reranked_docs = self.reranker.rerank(
+                    query, top_docs, vector_store=vector_store, query_embedding=embedding, term_index=term_index
+                )
+                selected_docs = reranked_docs[:rerank_top_k]
+                context_str = "\n\n".join([doc.page_content for doc, score in selected_docs])
+                return {
+                    "question": query,
+                    "context": f"[{context_str}]",
+                    "rerank_scores": [f"{score:.4f}" for doc, score in selected_docs],
+                    "passages": [self._passage(doc, score) for doc, score in selected_docs]
+                }
+
+            context_str = "\n\n".join([doc.page_content for doc in top_docs[:5]])
+            return {
+                "question": query,
+                "context": f"[{context_str}]",
+                "rerank_scores": None,
+                # Without reranking, rank order (MMR or fused) is the only score.
+                "passages": [self._passage(doc, 1.0 / (rank + 1)) for rank, doc in enumerate(top_docs[:5])]
+            }
+
+    def retrieve(
+        self,
+        vector_store,
+        queries: Dict[str, str],
+        use_reranking: bool = True,
+        rerank_top_k: int = 5,
+        lexical_index: Optional[BM25Index] = None,
+        term_index: Optional[MetadataTermIndex] = None
+    ) -> List[dict]:
+        """
+        Retrieves context for every sub-query.
+
+        Args:
+            vector_store (FAISS): Store to search.
+            queries (Dict[str, str]): Transformed sub-queries, e.g. {"Q1": "...", "Q2": "..."}.
+            use_reranking (bool): Whether to rerank the MMR results.
+            rerank_top_k (int): Number of reranked docs kept per sub-query.
+            lexical_index (BM25Index): Optional lexical index for hybrid retrieval.
+            term_index (MetadataTermIndex): Optional precomputed term sets for rerank boosts.
+
+        Returns:
+            One {"question", "context", "rerank_scores", "passages"} dict per sub-query, in
+            input order; "passages" lists the selected chunks with their scores.
+        """
+        texts = list(queries.values())
+        if not texts:
+            return []
+
+        tracer = get_tracer()
+        with tracer.span("retrieval", queries=len(texts), hybrid=lexical_index is not None, reranking=use_reranking):
+            with tracer.span("embed_queries", queries=len(texts)):
+                embeddings = self._embed_queries(vector_store, texts)
+            args = [
+                (vector_store, text, embedding, use_reranking, rerank_top_k, lexical_index, term_index)
+                for text, embedding in zip(texts, embeddings)
+            ]
+
+            if len(args) == 1 or self.max_workers <= 1:
+                return [self._retrieve_one(*arg) for arg in args]
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(args))) as executor:
+                return list(executor.map(propagate(lambda arg: self._retrieve_one(*arg)), args))
@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+DOCSTORE_FILE = "docstore.sqlite"
+# Ids per IN (...) query; SQLite caps the number of bound parameters per statement.
+_ID_BATCH_SIZE = 500
+
+
+def _compact_sentences(text: str, sentences: Sequence[str]) -> list:
+    """
+    Replaces each sentence that occurs in the chunk text with its [start, end]
+    span, so the text is stored only once. Sentences not found verbatim are kept.
+    """
+    spans = []
+    cursor = 0
+    for sentence in sentences:
+        start = text.find(sentence, cursor)
+        if start < 0:
+            spans.append(sentence)
+            continue
+        end = start + len(sentence)
+        spans.append([start, end])
+        cursor = end
+    return spans
+
+
+def _expand_sentences(text: str, spans: list) -> List[str]:
+    return [text[span[0]:span[1]] if isinstance(span, list) else span for span in spans]
+
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore kept in a SQLite file next to index.faiss.
+
+    Chunks are read on demand for the ids a search returns, so loading a store no
+    longer unpickles every chunk. The `sentences` metadata list is stored as spans
+    into the chunk text instead of a second copy of it. Writes become durable when
+    `save_mapping` commits them together with the FAISS position -> id mapping;
+    `rollback` drops them, e.g. when a sync fails before the store is saved.
+    """
+
+    def __init__(self, path: str, reset: bool = False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            if reset:
+                self._conn.execute("DROP TABLE IF EXISTS chunks")
+                self._conn.execute("DROP TABLE IF EXISTS index_map")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL, sentences TEXT)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS index_map (position INTEGER PRIMARY KEY, id TEXT NOT NULL)")
+            self._conn.commit()
+
+    @staticmethod
+    def _to_row(doc_id: str, doc: Document) -> Tuple[str, str, str, Optional[str]]:
+        metadata = dict(doc.metadata)
+        sentences = metadata.pop("sentences", None)
+        spans = json.dumps(_compact_sentences(doc.page_content, sentences), separators=(",", ":")) if sentences is not None else None
+        return doc_id, doc.page_content, json.dumps(metadata, separators=(",", ":")), spans
+
+    @staticmethod
+    def _from_row(doc_id: str, text: str, metadata: str, spans: Optional[str]) -> Document:
+        meta = json.loads(metadata)
+        if spans is not None:
+            meta["sentences"] = _expand_sentences(text, json.loads(spans))
+        return Document(id=doc_id, page_content=text, metadata=meta)
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute("SELECT id, text, metadata, sentences FROM chunks WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return self._from_row(*row)
+
+    def mget(self, ids: Sequence[str]) -> List[Optional[Document]]:
+        """Fetches several chunks in one query, in the order of `ids`."""
+        found: Dict[str, Document] = {}
+        with self._lock:
+            for start in range(0, len(ids), _ID_BATCH_SIZE):
+                batch = list(ids[start:start + _ID_BATCH_SIZE])
+                placeholders = ",".join("?" * len(batch))
+                for row in self._conn.execute(
+                    f"SELECT id, text, metadata, sentences FROM chunks WHERE id IN ({placeholders})", batch
+                ):
+                    found[row[0]] = self._from_row(*row)
+        return [found.get(doc_id) for doc_id in ids]
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        ids = list(texts)
+        with self._lock:
+            overlapping = []
+            for start in range(0, len(ids), _ID_BATCH_SIZE):
+                batch = ids[start:start + _ID_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                overlapping += self._conn.execute(f"SELECT id FROM chunks WHERE id IN ({placeholders})", batch).fetchall()
+            if overlapping:
+                raise ValueError(f"Tried to add ids that already exist: {[row[0] for row in overlapping]}")
+            self._conn.executemany(
+                "INSERT INTO chunks (id, text, metadata, sentences) VALUES (?, ?, ?, ?)",
+                [self._to_row(doc_id, doc) for doc_id, doc in texts.items()]
+            )
+
+    def delete(self, ids: List) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(doc_id,) for doc_id in ids])
+
+    def iter_documents(self) -> Iterator[Tuple[str, Document]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id, text, metadata, sentences FROM chunks").fetchall()
+        for row in rows:
+            yield row[0], self._from_row(*row)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def save_mapping(self, index_to_docstore_id: Dict[int, str]) -> None:
+        """Stores the FAISS position -> docstore id mapping and commits all pending writes."""
+        with self._lock:
+            self._conn.execute("DELETE FROM index_map")
+            self._conn.executemany(
+                "INSERT INTO index_map (position, id) VALUES (?, ?)",
+                sorted(index_to_docstore_id.items())
+            )
+            self._conn.commit()
+
+    def rollback(self) -> None:
+        """Discards the adds and deletes made since the last `save_mapping`."""
+        with self._lock:
+            self._conn.rollback()
+
+    def load_mapping(self) -> Dict[int, str]:
+        with self._lock:
+            return dict(self._conn.execute("SELECT position, id FROM index_map"))
+
+    @staticmethod
+    def exists(index_path: str) -> bool:
+        return os.path.exists(os.path.join(index_path, DOCSTORE_FILE))
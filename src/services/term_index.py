@@ -0,0 +1,147 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.services.lexical_index import iter_store_documents
+
+METADATA_TERMS_FILE = "metadata_terms.npz"
+
+# Boost added to a candidate's similarity for every question term found in the field.
+FIELD_WEIGHTS = {"nouns": 0.05, "entities": 0.1, "noun_chunks": 0.07}
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+class MetadataTermIndex:
+    """
+    Compact per-chunk term sets for rerank boosts.
+
+    The nouns, entities and noun chunks of every chunk are lowercased and interned
+    once into integer ids, and stored as sorted unique int32 arrays keyed by
+    docstore id. Boosts for a whole candidate list are then computed with a single
+    vectorized membership test instead of per-document Python set operations.
+    """
+
+    FIELDS = tuple(FIELD_WEIGHTS)
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Tuple[np.ndarray, ...]] = {}
+        self._weights = np.asarray([FIELD_WEIGHTS[field] for field in self.FIELDS], dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def _intern(self, term: str) -> int:
+        term_id = self.vocabulary.get(term)
+        if term_id is None:
+            term_id = self.vocabulary[term] = len(self.vocabulary)
+        return term_id
+
+    def _encode(self, doc: Document) -> Tuple[np.ndarray, ...]:
+        return tuple(
+            np.unique(np.asarray([self._intern(value.lower()) for value in doc.metadata.get(field, []) or []], dtype=np.int32))
+            for field in self.FIELDS
+        )
+
+    def add_documents(self, ids: Sequence[str], docs: Sequence[Document]) -> None:
+        with self._lock:
+            for doc_id, doc in zip(ids, docs):
+                self.doc_terms[doc_id] = self._encode(doc)
+
+    def remove_documents(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in ids:
+                self.doc_terms.pop(doc_id, None)
+
+    def terms_for(self, doc: Document, query_ids: Dict[str, int]) -> Tuple[np.ndarray, ...]:
+        """
+        Returns the field arrays of a doc. A doc that is not indexed is encoded
+        against `query_ids` only, since no other term can match, and is not
+        cached, so candidates from outside the index do not grow it.
+        """
+        key = doc.id or doc.metadata.get("source_id")
+        with self._lock:
+            terms = self.doc_terms.get(key) if key else None
+        if terms is not None:
+            return terms
+        return tuple(
+            np.unique(np.asarray(
+                [query_ids[value.lower()] for value in doc.metadata.get(field, []) or [] if value.lower() in query_ids],
+                dtype=np.int32
+            ))
+            for field in self.FIELDS
+        )
+
+    def lookup(self, terms: Iterable[str]) -> Dict[str, int]:
+        """
+        Maps question terms to term ids. Terms missing from the vocabulary get
+        temporary negative ids, which can still match docs that are not indexed.
+        """
+        with self._lock:
+            return {term: self.vocabulary.get(term, -(i + 1)) for i, term in enumerate(sorted(set(terms)))}
+
+    def match_boosts(self, docs: Sequence[Document], question_terms: Iterable[str]) -> np.ndarray:
+        """
+        Computes sum(weight[field] * |question_terms ∩ field_terms|) for every doc at once.
+        """
+        boosts = np.zeros(len(docs), dtype=np.float32)
+        query_ids = self.lookup(question_terms)
+        if not docs or not query_ids:
+            return boosts
+
+        arrays: List[np.ndarray] = []
+        for doc in docs:
+            arrays.extend(self.terms_for(doc, query_ids))
+        lengths = np.fromiter((array.size for array in arrays), dtype=np.int64, count=len(arrays))
+        if not lengths.any():
+            return boosts
+
+        values = np.concatenate(arrays)
+        n_fields = len(self.FIELDS)
+        rows = np.repeat(np.arange(len(docs) * n_fields) // n_fields, lengths)
+        weights = np.repeat(np.tile(self._weights, len(docs)), lengths)
+        hits = np.isin(values, np.asarray(list(query_ids.values()), dtype=np.int32), assume_unique=False)
+        return np.bincount(rows[hits], weights=weights[hits], minlength=len(docs)).astype(np.float32)
+
+    def save(self, index_path: str) -> None:
+        with self._lock:
+            doc_ids = list(self.doc_terms)
+            vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+            arrays = {
+                "vocabulary": np.asarray(vocabulary, dtype=str),
+                "doc_ids": np.asarray(doc_ids, dtype=str),
+            }
+            for i, field in enumerate(self.FIELDS):
+                field_arrays = [self.doc_terms[doc_id][i] for doc_id in doc_ids]
+                arrays[f"{field}_offsets"] = np.cumsum([0] + [array.size for array in field_arrays], dtype=np.int64)
+                arrays[f"{field}_values"] = np.concatenate(field_arrays) if field_arrays else _EMPTY
+
+        path = os.path.join(index_path, METADATA_TERMS_FILE)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional["MetadataTermIndex"]:
+        path = os.path.join(index_path, METADATA_TERMS_FILE)
+        if not os.path.exists(path):
+            return None
+        index = cls()
+        with np.load(path, allow_pickle=False) as data:
+            index.vocabulary = {term: i for i, term in enumerate(data["vocabulary"].tolist())}
+            fields = [(data[f"{field}_offsets"], data[f"{field}_values"].astype(np.int32)) for field in cls.FIELDS]
+            for row, doc_id in enumerate(data["doc_ids"].tolist()):
+                index.doc_terms[doc_id] = tuple(values[offsets[row]:offsets[row + 1]] for offsets, values in fields)
+        return index
+
+    @classmethod
+    def build_from_store(cls, vector_store) -> "MetadataTermIndex":
+        index = cls()
+        ids, docs = [], []
+        for doc_id, doc in iter_store_documents(vector_store):
+            ids.append(doc_id)
+            docs.append(doc)
+        index.add_documents(ids, docs)
+        return index
@@ -0,0 +1,224 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Upper bounds (seconds) of the span duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed pipeline stage. Attributes hold counts and labels (tokens,
+    candidates, cache hits, ...); numeric ones can be accumulated with `add`.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes: Dict[str, object] = dict(attributes)
+        self.children: List["Span"] = []
+        self.started_at = time.time()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        if parent is not None:
+            with parent._lock:
+                parent.children.append(self)
+
+    def set(self, **attributes) -> "Span":
+        with self._lock:
+            self.attributes.update(attributes)
+        return self
+
+    def add(self, **counts) -> "Span":
+        with self._lock:
+            for key, value in counts.items():
+                self.attributes[key] = self.attributes.get(key, 0) + value
+        return self
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.parent is None:
+            get_tracer().finish(self)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            children = list(self.children)
+            attributes = dict(self.attributes)
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": attributes,
+            "error": self.error,
+            "children": [child.to_dict() for child in children],
+        }
+
+    def breakdown(self) -> List[dict]:
+        """Flattens the span tree (depth-first) into rows for a timing table."""
+        rows = []
+
+        def visit(span: "Span", depth: int) -> None:
+            rows.append({
+                "stage": f"{'  ' * depth}{span.name}",
+                "ms": round((span.duration or 0.0) * 1000, 1),
+                **{key: value for key, value in span.attributes.items() if isinstance(value, (int, float, str, bool))},
+            })
+            for child in list(span.children):
+                visit(child, depth + 1)
+
+        visit(self, 0)
+        return rows
+
+
+class Tracer:
+    """
+    Collects finished traces, keeps per-stage metrics and exports them.
+
+    Finished root spans are appended to `export_path` as one JSON line each
+    (env TRACE_EXPORT_PATH, empty to disable) and kept in a bounded in-memory
+    history. Every span updates a duration histogram and per-attribute counters
+    per stage name, served in Prometheus text format by `prometheus_text`.
+    """
+
+    def __init__(self, export_path: Optional[str] = None, max_traces: int = 200):
+        self.export_path = export_path
+        self.recent = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._errors: Dict[str, int] = defaultdict(int)
+        self._sums: Dict[str, float] = defaultdict(float)
+        self._buckets: Dict[str, List[int]] = defaultdict(lambda: [0] * len(DURATION_BUCKETS))
+        self._attribute_sums: Dict[tuple, float] = defaultdict(float)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Times the enclosed block as a child of the current span (or as a new trace)."""
+        span = Span(name, parent=_current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        else:
+            span.end()
+        finally:
+            _current_span.reset(token)
+
+    def start_span(self, name: str, **attributes) -> Span:
+        """
+        Starts a span under the current one without making it current, for work
+        that does not fit a `with` block (e.g. generators). Call `end()` on it.
+        """
+        return Span(name, parent=_current_span.get(), **attributes)
+
+    def _observe(self, span: Span) -> None:
+        self._counts[span.name] += 1
+        if span.error:
+            self._errors[span.name] += 1
+        duration = span.duration or 0.0
+        self._sums[span.name] += duration
+        buckets = self._buckets[span.name]
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if duration <= bound:
+                buckets[i] += 1
+        for key, value in span.attributes.items():
+            if isinstance(value, (int, float)):
+                self._attribute_sums[(span.name, key)] += float(value)
+        for child in list(span.children):
+            self._observe(child)
+
+    def finish(self, root: Span) -> None:
+        record = root.to_dict()
+        with self._lock:
+            self._observe(root)
+            self.recent.append(record)
+            if self.export_path:
+                directory = os.path.dirname(self.export_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+
+    def prometheus_text(self, prefix: str = "rag") -> str:
+        """Renders the collected metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Duration of pipeline stages.",
+            f"# TYPE {prefix}_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._counts):
+                for bound, count in zip(DURATION_BUCKETS, self._buckets[name]):
+                    lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {self._counts[name]}')
+                lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{name}"}} {self._sums[name]:.6f}')
+                lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{name}"}} {self._counts[name]}')
+
+            lines += [f"# HELP {prefix}_stage_errors_total Stages that raised.", f"# TYPE {prefix}_stage_errors_total counter"]
+            for name in sorted(self._counts):
+                lines.append(f'{prefix}_stage_errors_total{{stage="{name}"}} {self._errors[name]}')
+
+            lines += [
+                f"# HELP {prefix}_stage_attribute_total Sum of numeric stage attributes (tokens, candidates, cache hits).",
+                f"# TYPE {prefix}_stage_attribute_total counter",
+            ]
+            for (name, key), value in sorted(self._attribute_sums.items()):
+                lines.append(f'{prefix}_stage_attribute_total{{stage="{name}",attribute="{key}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def add_to_current(**counts) -> None:
+    """Accumulates counts on the current span; a no-op outside any trace."""
+    span = _current_span.get()
+    if span is not None:
+        span.add(**counts)
+
+
+def propagate(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Binds `fn` to the caller's tracing context so spans opened inside a thread
+    pool worker nest under the span that submitted the work.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs) -> T:
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Returns the process-wide tracer; env TRACE_EXPORT_PATH sets the JSONL file."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(export_path=os.getenv("TRACE_EXPORT_PATH", "traces/traces.jsonl") or None)
+        return _tracer
@@ -1,17 +1,265 @@
+from __future__ import annotations
+
+import hashlib
+import json
 import os
-from typing import List, Literal, Union
+import random
+from dataclasses import replace
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Literal, Optional, Sequence, Tuple, Union
+from uuid import NAMESPACE_URL, uuid4, uuid5
+import numpy as np
 from langchain_core.documents import Document
-from langchain_community.vectorstores import Chroma
-from langchain.vectorstores import FAISS
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from src.services.ann_index import IndexSpec, build_index, evaluate_recall, prepare_index, set_search_params
+from src.services.embedding_cache import get_shared_embeddings
+from src.services.embedding_providers import load_provider_info, provider_info, save_provider_info
+from src.services.ingestion_checkpoint import CHECKPOINT_DIR, IngestionCheckpoint, pages_key, run_key, skip_pages
+from src.services.ingestion_pipeline import IngestionPipeline, IngestionProgress, IngestionResult
+from src.services.lexical_index import BM25Index, iter_store_documents
+from src.services.sqlite_docstore import DOCSTORE_FILE, SQLiteDocstore
+from src.services.term_index import MetadataTermIndex
+from src.services.tracing import get_tracer
+
+if TYPE_CHECKING:
+    from langchain.vectorstores import FAISS
+    from langchain_community.vectorstores import Chroma
+    from src.services.chunking_process import SemanticChunkerWithNLP
+    from src.services.loading_documents import DocumentLoader
+
+MANIFEST_FILE = "manifest.json"
+FAISS_INDEX_FILE = "index.faiss"
+LEGACY_DOCSTORE_FILE = "index.pkl"
 
 
 class VectorStorageManager:
-    def __init__(self, embedding_model: Union[GoogleGenerativeAIEmbeddings, None] = None):
-        self._embedding_model = embedding_model or GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001")
+    def __init__(self, embedding_model: Union[Embeddings, None] = None, index_spec: Optional[IndexSpec] = None):
+        self._embedding_model = embedding_model or get_shared_embeddings()
+        self.index_spec = index_spec or IndexSpec.from_env()
         self._chroma_db_path: str = "./chroma_db"
         self._faiss_index_path: str = "./faiss_index"
+        self.last_sync_report: Dict[str, List[str]] = {}
+
+    @staticmethod
+    def store_path_for(base_path: str, source: str) -> str:
+        """Returns the stable vector store directory used for a given source folder or Drive id."""
+        return os.path.join(base_path, str(uuid5(NAMESPACE_URL, os.path.abspath(source))))
+
+    @staticmethod
+    def store_version(index_path: str) -> str:
+        """
+        Returns a fingerprint of the store files at `index_path` that changes
+        whenever the index, its docstore or its manifest is rewritten.
+        """
+        digest = hashlib.sha256(os.path.abspath(index_path).encode("utf-8"))
+        for filename in sorted(os.listdir(index_path)) if os.path.isdir(index_path) else []:
+            if filename.startswith("."):
+                continue  # ingestion checkpoints are not part of the saved store
+            stat = os.stat(os.path.join(index_path, filename))
+            digest.update(f"{filename}:{stat.st_mtime_ns}:{stat.st_size};".encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def load_manifest(index_path: str) -> dict:
+        manifest_path = os.path.join(index_path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return {"files": {}}
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def save_manifest(index_path: str, manifest: dict) -> None:
+        manifest_path = os.path.join(index_path, MANIFEST_FILE)
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def _build_store(self, documents: List[Document], ids: Optional[List[str]] = None, spec: Optional[IndexSpec] = None) -> FAISS:
+        """Embeds documents and builds a FAISS store on the index type described by `spec`."""
+        texts = [doc.page_content for doc in documents]
+        vectors = np.asarray(self._embedding_model.embed_documents(texts), dtype=np.float32)
+        return self.append_to_store(
+            None, texts, vectors, [doc.metadata for doc in documents], ids or [str(uuid4()) for _ in documents], spec
+        )
+
+    def append_to_store(
+        self,
+        vector_store: Optional[FAISS],
+        texts: List[str],
+        vectors: np.ndarray,
+        metadatas: List[dict],
+        ids: List[str],
+        spec: Optional[IndexSpec] = None
+    ) -> FAISS:
+        """
+        Adds already embedded chunks to `vector_store`. When there is no store yet,
+        one is created on the index type described by `spec`, trained on `vectors`.
+        """
+        from langchain.vectorstores import FAISS
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vector_store is None:
+            vector_store = FAISS(
+                embedding_function=self._embedding_model,
+                index=build_index(spec or self.index_spec, vectors),
+                docstore=InMemoryDocstore(),
+                index_to_docstore_id={}
+            )
+        vector_store.add_embeddings(zip(texts, vectors.tolist()), metadatas=metadatas, ids=ids)
+        return vector_store
+
+    def embeddings_of(self, vector_store: Optional[FAISS]) -> Embeddings:
+        """Embeddings to add chunks to `vector_store` with (the configured model for a new store)."""
+        return vector_store.embedding_function if vector_store is not None else self._embedding_model
+
+    @staticmethod
+    def _delete_from_store(vector_store: FAISS, ids: List[str], spec: IndexSpec) -> None:
+        """
+        Deletes ids from the store. Only flat and SQ8 indexes compact their
+        positions on remove_ids, which langchain's renumbered position -> id
+        mapping relies on; IVF indexes keep the old positions and HNSW cannot
+        remove at all, so those are rebuilt from the remaining stored vectors.
+        """
+        if spec.kind in ("flat", "sq8"):
+            vector_store.delete(ids)
+        else:
+            removed = set(ids)
+            old_mapping = vector_store.index_to_docstore_id
+            keep = [pos for pos in sorted(old_mapping) if old_mapping[pos] not in removed]
+            vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)[keep]
+            index = build_index(spec, vectors)
+            index.add(vectors)
+            vector_store.index = index
+            stored = set(old_mapping.values())
+            vector_store.docstore.delete([doc_id for doc_id in ids if doc_id in stored])
+            vector_store.index_to_docstore_id = {i: old_mapping[pos] for i, pos in enumerate(keep)}
+
+        if vector_store.index.ntotal != len(vector_store.index_to_docstore_id):
+            raise RuntimeError(
+                f"FAISS index holds {vector_store.index.ntotal} vectors but the docstore maps "
+                f"{len(vector_store.index_to_docstore_id)} after deleting chunks"
+            )
+
+    @staticmethod
+    def save_store(vector_store: FAISS, index_path: str) -> None:
+        """
+        Saves the FAISS index and its docstore in the compact format: index.faiss
+        plus a SQLite docstore holding the chunks and the position -> id mapping.
+        In-memory docstores (new or legacy pickled stores) are converted on the
+        way, and a leftover index.pkl is removed once the compact copy is written.
+        The embedding provider that built the vectors is recorded next to them.
+        """
+        import faiss
+
+        os.makedirs(index_path, exist_ok=True)
+        docstore_path = os.path.join(index_path, DOCSTORE_FILE)
+        docstore = vector_store.docstore
+        if not (isinstance(docstore, SQLiteDocstore) and os.path.abspath(docstore.path) == os.path.abspath(docstore_path)):
+            compact = SQLiteDocstore(docstore_path, reset=True)
+            compact.add(dict(iter_store_documents(vector_store)))
+            vector_store.docstore = compact
+
+        index_file = os.path.join(index_path, FAISS_INDEX_FILE)
+        faiss.write_index(vector_store.index, f"{index_file}.tmp")
+        vector_store.docstore.save_mapping(vector_store.index_to_docstore_id)
+        os.replace(f"{index_file}.tmp", index_file)
+
+        info = provider_info(vector_store.embedding_function)
+        save_provider_info(index_path, replace(info, dimensions=int(vector_store.index.d)))
+
+        legacy_path = os.path.join(index_path, LEGACY_DOCSTORE_FILE)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+    def _embeddings_for(self, index_path: str) -> Embeddings:
+        """
+        Returns the embeddings to query the store at `index_path` with: the provider
+        recorded when it was built if that differs from the configured one, so
+        query vectors always share the store's embedding space.
+        """
+        recorded = load_provider_info(index_path)
+        if recorded is None or recorded.provider == "custom":
+            return self._embedding_model
+        if recorded.same_space(provider_info(self._embedding_model)):
+            return self._embedding_model
+        print(f"Store at {index_path} was built with {recorded.provider}:{recorded.model}; using that provider for it.")
+        return get_shared_embeddings(recorded.model, recorded.provider)
+
+    def _load_store(self, index_path: str) -> FAISS:
+        """
+        Loads a store saved by `save_store`. Only the index and the id mapping are
+        read up front; chunk text and metadata are fetched per search result.
+        Stores that still have a pickled index.pkl are loaded the old way.
+        """
+        from langchain.vectorstores import FAISS
+
+        if not SQLiteDocstore.exists(index_path):
+            return FAISS.load_local(
+                folder_path=index_path,
+                embeddings=self._embeddings_for(index_path),
+                allow_dangerous_deserialization=True  # Legacy pickled docstore
+            )
+
+        import faiss
+
+        docstore = SQLiteDocstore(os.path.join(index_path, DOCSTORE_FILE))
+        return FAISS(
+            embedding_function=self._embeddings_for(index_path),
+            index=faiss.read_index(os.path.join(index_path, FAISS_INDEX_FILE)),
+            docstore=docstore,
+            index_to_docstore_id=docstore.load_mapping()
+        )
+
+    def migrate_to_compact(self, index_path: str) -> bool:
+        """Rewrites a legacy pickled store at `index_path` in the compact SQLite format."""
+        if SQLiteDocstore.exists(index_path):
+            return False
+        self.save_store(self._load_store(index_path), index_path)
+        return True
+
+    def set_search_params(self, vector_store: FAISS, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Tunes nprobe (IVF indexes) and efSearch (HNSW) of a loaded store at query time."""
+        set_search_params(vector_store.index, nprobe=nprobe, ef_search=ef_search)
+
+    def evaluate_index(self, vector_store: FAISS, queries: Optional[List[str]] = None, k: int = 10, sample_size: int = 100) -> dict:
+        """
+        Reports recall@k, per-query latency and size of the store's index against an
+        exact flat baseline. The baseline uses the exact embeddings of the stored
+        chunks (served by the embedding cache), so quantized indexes are compared
+        with the true vectors rather than their own reconstructions.
+
+        Args:
+            vector_store (FAISS): Store to evaluate.
+            queries (List[str]): Evaluation queries; defaults to a sample of stored chunk texts.
+            k (int): Cut-off for recall.
+            sample_size (int): Number of chunk texts sampled when no queries are given.
+        """
+        mapping = vector_store.index_to_docstore_id
+        ids = [mapping[pos] for pos in range(len(mapping))]
+        if isinstance(vector_store.docstore, SQLiteDocstore):
+            texts = [doc.page_content for doc in vector_store.docstore.mget(ids)]
+        else:
+            texts = [vector_store.docstore.search(doc_id).page_content for doc_id in ids]
+        embeddings = vector_store.embedding_function
+        exact_vectors = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+        if queries:
+            query_vectors = np.asarray([embeddings.embed_query(query) for query in queries], dtype=np.float32)
+        else:
+            sample = random.Random(0).sample(range(len(texts)), min(sample_size, len(texts)))
+            query_vectors = exact_vectors[sample]
+
+        return evaluate_recall(vector_store.index, exact_vectors, query_vectors, k=k)
 
     def store_in_chroma(self, documents: List[Document]) -> Union[Chroma, Literal[False]]:
         """
@@ -23,6 +271,8 @@ class VectorStorageManager:
         Returns:
             Chroma instance if successful, else False.
         """
+        from langchain_community.vectorstores import Chroma
+
         try:
             print("Storing vectors in Chroma...")
             vector_store = Chroma.from_documents(
@@ -47,33 +297,287 @@ class VectorStorageManager:
         Returns:
             FAISS instance if successful, else False.
         """
+        tracer = get_tracer()
         try:
-            print("Storing vectors in FAISS...")
-            vector_store = FAISS.from_documents(
-                documents=documents,
-                embedding=self._embedding_model
-            )
-            vector_store.save_local(index_path)
+            print(f"Storing vectors in FAISS ({self.index_spec.kind} index)...")
+            with tracer.span("embed_and_index", chunks=len(documents), index_kind=self.index_spec.kind):
+                vector_store = self._build_store(documents)
+            with tracer.span("save_store"):
+                self.save_store(vector_store, index_path)
+                self.index_spec.save(index_path)
+                BM25Index.build_from_store(vector_store).save(index_path)
+                MetadataTermIndex.build_from_store(vector_store).save(index_path)
             return vector_store
         except Exception as e:
             print(f"[ERROR] FAISS storage failed: {e}")
             return False
 
-    def exist_in_faiss(self, index_path: str) -> bool:
+    def _ingest(
+        self,
+        pages: Iterable[Document],
+        index_path: str,
+        chunker: "SemanticChunkerWithNLP",
+        checkpoint_key: Optional[str],
+        vector_store: Optional[FAISS],
+        spec: IndexSpec,
+        lexical_index: BM25Index,
+        term_index: MetadataTermIndex,
+        total_pages: Optional[int] = None,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None
+    ) -> Tuple[IngestionResult, Optional[IngestionCheckpoint]]:
         """
-        Checks if a FAISS index exists at the specified path.
+        Runs the streaming pipeline over `pages`. With a `checkpoint_key`, every
+        embedded batch is checkpointed under `index_path`, and batches left by an
+        earlier failed run with the same key are restored instead of re-embedded.
+        """
+        checkpoint = None
+        restored = []
+        if checkpoint_key:
+            embeddings_info = provider_info(self.embeddings_of(vector_store)).to_dict()
+            checkpoint = IngestionCheckpoint(index_path, run_key(checkpoint_key, embeddings_info, spec.kind))
+            restored, done = checkpoint.restore()
+            pages = skip_pages(pages, done)
+            if total_pages is not None:
+                total_pages = max(0, total_pages - len(done))
+
+        result = IngestionPipeline.from_env(chunker, self).run(
+            pages,
+            vector_store=vector_store,
+            spec=spec,
+            lexical_index=lexical_index,
+            term_index=term_index,
+            on_batch=checkpoint.write if checkpoint else None,
+            restored=restored,
+            total_pages=total_pages,
+            on_progress=on_progress
+        )
+        return result, checkpoint
+
+    @staticmethod
+    def _resume_hint(index_path: str) -> str:
+        if os.path.isdir(os.path.join(index_path, CHECKPOINT_DIR)):
+            return " (finished batches are checkpointed; run again to resume)"
+        return ""
+
+    def store_pages_in_faiss(
+        self,
+        pages: Iterable[Document],
+        index_path: str,
+        chunker: "SemanticChunkerWithNLP",
+        checkpoint_key: Optional[str] = None,
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None
+    ) -> Union[FAISS, Literal[False]]:
+        """
+        Chunks, enriches and embeds `pages` through the streaming ingestion
+        pipeline into a new FAISS store saved at `index_path`.
+
+        Finished batches are checkpointed under `index_path/.checkpoints`, so a
+        failed run resumes where it stopped when called again with the same
+        pages. Page lists are identified by their content; streamed pages are
+        only checkpointed when a `checkpoint_key` is given.
 
         Returns:
-            bool: True if the index exists, else False.
+            FAISS instance if successful, else False.
         """
+        tracer = get_tracer()
+        if checkpoint_key is None and isinstance(pages, Sequence):
+            checkpoint_key = pages_key(pages)
         try:
-            vector_store = FAISS.load_local(
-                folder_path=index_path,
-                embeddings=self._embedding_model,
-                allow_dangerous_deserialization=True  # Enable explicit trust
+            os.makedirs(index_path, exist_ok=True)
+            lexical_index, term_index = BM25Index(), MetadataTermIndex()
+            result, checkpoint = self._ingest(
+                pages, index_path, chunker, checkpoint_key, None, self.index_spec, lexical_index, term_index,
+                total_pages=len(pages) if isinstance(pages, Sequence) else None,
+                on_progress=on_progress
             )
+            if result.vector_store is None:
+                print("[ERROR] No content to index")
+                return False
+            with tracer.span("save_store"):
+                self.save_store(result.vector_store, index_path)
+                self.index_spec.save(index_path)
+                lexical_index.save(index_path)
+                term_index.save(index_path)
+            if checkpoint is not None:
+                checkpoint.clear()
+            return result.vector_store
+        except Exception as e:
+            print(f"[ERROR] FAISS storage failed: {e}{self._resume_hint(index_path)}")
+            return False
+
+    def exist_in_faiss(self, index_path: str) -> Optional[FAISS]:
+        """
+        Loads the FAISS index at the specified path.
+
+        Returns:
+            FAISS instance if the index exists and loads, else None.
+        """
+        try:
+            vector_store = self._load_store(index_path)
+            prepare_index(vector_store.index, IndexSpec.load(index_path))
             return vector_store
         except Exception as e:
             print(f"[ERROR] FAISS existence check failed: {e}")
-            return False
+            return None
+
+    def load_lexical_index(self, index_path: str, vector_store: FAISS) -> BM25Index:
+        """
+        Loads the BM25 index saved next to the FAISS index, building and saving it
+        from the docstore first if the store predates lexical indexing.
+        """
+        lexical_index = BM25Index.load(index_path)
+        if lexical_index is None:
+            print("Building lexical index from the FAISS docstore...")
+            lexical_index = BM25Index.build_from_store(vector_store)
+            lexical_index.save(index_path)
+        return lexical_index
+
+    def load_term_index(self, index_path: str, vector_store: FAISS) -> MetadataTermIndex:
+        """
+        Loads the interned metadata term index used for rerank boosts, building and
+        saving it from the docstore first if the store predates it.
+        """
+        term_index = MetadataTermIndex.load(index_path)
+        if term_index is None:
+            print("Building metadata term index from the FAISS docstore...")
+            term_index = MetadataTermIndex.build_from_store(vector_store)
+            term_index.save(index_path)
+        return term_index
+
+    def sync_folder(
+        self,
+        folder_path: str,
+        index_path: str,
+        document_loader: "DocumentLoader",
+        chunker: "SemanticChunkerWithNLP",
+        on_progress: Optional[Callable[[IngestionProgress], None]] = None
+    ) -> Union[FAISS, Literal[False]]:
+        """
+        Brings the FAISS index at `index_path` in line with the PDFs in `folder_path`.
+
+        A manifest of file hashes and mtimes is kept next to the index. New PDFs are
+        added, chunks of removed PDFs are deleted and chunks of changed PDFs are
+        replaced; unchanged PDFs are not loaded, chunked or embedded again.
+        New and changed PDFs are streamed through the ingestion pipeline with
+        checkpoints, so a sync that fails partway resumes on the next run.
+
+        Args:
+            folder_path (str): Local folder containing the source PDFs.
+            index_path (str): Directory of the FAISS index and its manifest.
+            document_loader (DocumentLoader): Loader used for new and changed files.
+            chunker (SemanticChunkerWithNLP): Chunker used for new and changed files.
+            on_progress (Callable, optional): Receives IngestionProgress after each indexed batch.
+
+        Returns:
+            FAISS instance if successful, else False.
+        """
+        tracer = get_tracer()
+        with tracer.span("sync_folder", folder=os.path.abspath(folder_path)) as sync_span:
+            vector_store = None
+            try:
+                os.makedirs(index_path, exist_ok=True)
+                checkpoint = None
+                manifest = self.load_manifest(index_path)
+                known_files = manifest.get("files", {})
+                has_index = os.path.exists(os.path.join(index_path, FAISS_INDEX_FILE))
+                with tracer.span("load_store", exists=has_index) as span:
+                    vector_store = self.exist_in_faiss(index_path) if has_index else None
+                    if has_index and vector_store is None:
+                        # The manifest's chunk ids refer to the unreadable store; index every PDF again.
+                        print(f"[WARNING] Could not load the FAISS index at {index_path}; rebuilding it from all PDFs.")
+                        span.set(rebuild=True)
+                        has_index = False
+                        known_files = {}
+                spec = IndexSpec.load(index_path) if has_index else self.index_spec
+
+                current_files = {}
+                to_load = []
+                with tracer.span("scan_files") as span:
+                    for filename in sorted(os.listdir(folder_path)):
+                        if not filename.lower().endswith(".pdf"):
+                            continue
+                        path = os.path.join(folder_path, filename)
+                        stat = os.stat(path)
+                        entry = known_files.get(filename)
+                        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size and vector_store:
+                            current_files[filename] = entry
+                            continue
+
+                        sha256 = self._file_sha256(path)
+                        if entry and entry["sha256"] == sha256 and vector_store:
+                            current_files[filename] = {**entry, "mtime": stat.st_mtime, "size": stat.st_size}
+                            continue
+
+                        current_files[filename] = {"sha256": sha256, "mtime": stat.st_mtime, "size": stat.st_size, "ids": []}
+                        to_load.append(filename)
+                    span.set(files=len(current_files), to_load=len(to_load))
+
+                removed = [name for name in known_files if name not in current_files]
+                changed = [name for name in to_load if name in known_files]
+                stale_ids = [doc_id for name in removed + changed for doc_id in known_files[name].get("ids", [])]
+
+                lexical_index = BM25Index.load(index_path) if vector_store else None
+                if vector_store and lexical_index is None:
+                    lexical_index = BM25Index.build_from_store(vector_store)
+                lexical_index = lexical_index or BM25Index()
+                term_index = MetadataTermIndex.load(index_path) if vector_store else None
+                if vector_store and term_index is None:
+                    term_index = MetadataTermIndex.build_from_store(vector_store)
+                term_index = term_index or MetadataTermIndex()
+
+                if vector_store and stale_ids:
+                    print(f"Removing {len(stale_ids)} stale chunks from FAISS...")
+                    with tracer.span("remove_stale", chunks=len(stale_ids)):
+                        self._delete_from_store(vector_store, stale_ids, spec)
+                        lexical_index.remove_documents(stale_ids)
+                        term_index.remove_documents(stale_ids)
+
+                if to_load:
+                    print(f"Streaming {len(to_load)} PDFs into FAISS...")
+                    result, checkpoint = self._ingest(
+                        document_loader.iter_from_local(folder_path, filenames=to_load),
+                        index_path,
+                        chunker,
+                        run_key(sorted((name, current_files[name]["sha256"]) for name in to_load)),
+                        vector_store,
+                        spec,
+                        lexical_index,
+                        term_index,
+                        total_pages=document_loader.count_pages(folder_path, to_load),
+                        on_progress=on_progress
+                    )
+                    vector_store = result.vector_store
+                    for source, ids in result.ids_by_source.items():
+                        current_files[source]["ids"].extend(ids)
+                    sync_span.set(pages=result.pages, chunks=result.chunks, restored=result.restored_chunks)
+
+                if vector_store is None:
+                    print(f"[ERROR] No PDF content found in {folder_path}")
+                    return False
+
+                if to_load or removed or not has_index:
+                    with tracer.span("save_store"):
+                        self.save_store(vector_store, index_path)
+                        spec.save(index_path)
+                        lexical_index.save(index_path)
+                        term_index.save(index_path)
 
+                manifest.update({"source_folder": os.path.abspath(folder_path), "files": current_files})
+                self.save_manifest(index_path, manifest)
+                if checkpoint is not None:
+                    checkpoint.clear()
+                self.last_sync_report = {
+                    "added": [name for name in to_load if name not in known_files],
+                    "updated": changed,
+                    "removed": removed,
+                }
+                sync_span.set(**{key: len(names) for key, names in self.last_sync_report.items()})
+                return vector_store
+            except Exception as e:
+                # Deletes and adds on a loaded on-disk docstore are uncommitted until save_store;
+                # drop them so the database keeps matching the saved index and its write lock is released.
+                if vector_store is not None and isinstance(vector_store.docstore, SQLiteDocstore):
+                    vector_store.docstore.rollback()
+                print(f"[ERROR] FAISS sync failed: {e}{self._resume_hint(index_path)}")
+                sync_span.set(failed=str(e))
+                return False